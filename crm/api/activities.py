@@ -1,12 +1,52 @@
+import heapq
 import json
+import re
+from html import unescape
+from itertools import islice
 
 import frappe
-from bs4 import BeautifulSoup
 from frappe import _
 from frappe.desk.form.load import get_docinfo
-from frappe.query_builder import JoinType
-
-from crm.fcrm.doctype.crm_call_log.crm_call_log import parse_call_log
+from frappe.query_builder import JoinType, Order
+from frappe.utils import cint, get_datetime
+
+from crm.api.doc import decode_cursor, encode_cursor
+from crm.fcrm.doctype.crm_call_log.crm_call_log import parse_call_logs
+
+# attachment logs are a single link to the file, so these are enough to read them
+ANCHOR_PATTERN = re.compile(r"<a\b([^>]*)>(.*?)</a\s*>", re.IGNORECASE | re.DOTALL)
+HREF_PATTERN = re.compile(r"""\bhref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE)
+TAG_PATTERN = re.compile(r"<[^>]+>")
+
+ACTIVITY_LOG_FIELDS = ["name", "creation", "owner", "activity_type", "field", "old_value", "value"]
+
+ATTACHMENT_FIELDS = [
+	"name",
+	"file_name",
+	"file_type",
+	"file_url",
+	"file_size",
+	"is_private",
+	"modified",
+	"creation",
+	"owner",
+]
+
+COMMUNICATION_FIELDS = [
+	"name",
+	"communication_type",
+	"communication_date",
+	"creation",
+	"subject",
+	"content",
+	"sender_full_name",
+	"sender",
+	"recipients",
+	"cc",
+	"bcc",
+	"read_by_recipient",
+	"delivery_status",
+]
 
 
 @frappe.whitelist()
@@ -19,6 +59,196 @@ def get_activities(name):
 		frappe.throw(_("Document not found"), frappe.DoesNotExistError)
 
 
+@frappe.whitelist()
+def get_activities_page(name, limit=20, cursor=None):
+	"""
+	Get the newest `limit` timeline activities of a lead or deal, older than `cursor`.
+
+	Every source (versions, comments, communications, and those of the lead a
+	deal was converted from) is read newest first in batches and the sources
+	are merged lazily, so a page costs the same however long the history is.
+	Calls, notes, tasks and attachments are not paged and come with the first page.
+
+	:return: `{"activities": [...], "next_cursor": cursor of the next page or None}`
+	"""
+	if frappe.db.exists("CRM Deal", name):
+		doctype = "CRM Deal"
+	elif frappe.db.exists("CRM Lead", name):
+		doctype = "CRM Lead"
+	else:
+		frappe.throw(_("Document not found"), frappe.DoesNotExistError)
+
+	frappe.has_permission(doctype, "read", name, throw=True)
+
+	limit = cint(limit) or 20
+	before = decode_cursor(cursor, 2) if cursor else None
+
+	lead = frappe.db.get_value("CRM Deal", name, "lead") if doctype == "CRM Deal" else None
+	if doctype == "CRM Lead":
+		sources = get_timeline_sources(doctype, name, "created this lead", before, limit)
+	elif lead:
+		sources = get_timeline_sources(doctype, name, "converted the lead to this deal", before, limit)
+		sources += get_timeline_sources("CRM Lead", lead, "created this lead", before, limit)
+	else:
+		sources = get_timeline_sources(doctype, name, "created this deal", before, limit)
+
+	merged = heapq.merge(*sources, key=lambda entry: entry[:2], reverse=True)
+	entries = list(islice(merged, limit))
+	next_entry = next(merged, None)
+
+	# consecutive changes by one user are shown as one activity, keep them on one page
+	while next_entry and is_same_version_group(entries[-1][2], next_entry[2]):
+		entries.append(next_entry)
+		next_entry = next(merged, None)
+
+	activities = [entry[2] for entry in entries]
+	set_activity_attachments(activities)
+
+	res = {
+		"activities": handle_multiple_versions(activities),
+		"next_cursor": encode_cursor(list(entries[-1][:2])) if next_entry else None,
+	}
+	if not cursor:
+		res.update(get_linked_activities(doctype, name, lead))
+	return res
+
+
+def is_same_version_group(activity, next_activity):
+	return (
+		activity["activity_type"] in ["changed", "added", "removed"]
+		and next_activity["activity_type"] in ["changed", "added", "removed"]
+		and bool(activity.get("owner"))
+		and activity["owner"] == next_activity["owner"]
+	)
+
+
+def get_linked_activities(doctype, name, lead=None):
+	"""
+	Get calls, notes, tasks and attachments of a lead or deal, with those of
+	the lead the deal was converted from.
+	"""
+	linked = get_linked_records(name)
+	res = {
+		"calls": linked["calls"],
+		"notes": linked["notes"],
+		"tasks": linked["tasks"],
+		"attachments": get_attachments(doctype, name),
+	}
+	if lead:
+		lead_linked = get_linked_records(lead)
+		for key in ("calls", "notes", "tasks"):
+			res[key] = lead_linked[key] + res[key]
+		res["attachments"] = get_attachments("CRM Lead", lead) + res["attachments"]
+	return res
+
+
+def get_timeline_sources(doctype, name, creation_text, before, batch_size):
+	"""
+	Get one iterator per timeline source of `name`, each yielding
+	`(creation, name, activity)` from newest to oldest, older than `before`.
+	"""
+	is_lead = doctype == "CRM Lead"
+	meta = frappe.get_meta(doctype)
+	fields = {field.fieldname: {"label": field.label, "options": field.options} for field in meta.fields}
+
+	ActivityLog = frappe.qb.DocType("CRM Activity Log")
+	Comment = frappe.qb.DocType("Comment")
+	Communication = frappe.qb.DocType("Communication")
+	CommunicationLink = frappe.qb.DocType("Communication Link")
+
+	changes = iter_timeline_rows(
+		ActivityLog,
+		(ActivityLog.reference_docname == name) & (ActivityLog.reference_doctype == doctype),
+		ACTIVITY_LOG_FIELDS,
+		before,
+		batch_size,
+	)
+	comments = iter_timeline_rows(
+		Comment,
+		(Comment.reference_doctype == doctype)
+		& (Comment.reference_name == name)
+		& Comment.comment_type.isin(["Comment", "Attachment", "Attachment Removed"]),
+		["name", "creation", "owner", "content", "comment_type"],
+		before,
+		batch_size,
+	)
+	linked_communications = (
+		frappe.qb.from_(CommunicationLink)
+		.select(CommunicationLink.parent)
+		.where((CommunicationLink.link_doctype == doctype) & (CommunicationLink.link_name == name))
+	)
+	communications = iter_timeline_rows(
+		Communication,
+		Communication.communication_type.isin(["Communication", "Automated Message"])
+		& (
+			((Communication.reference_doctype == doctype) & (Communication.reference_name == name))
+			| Communication.name.isin(linked_communications)
+		),
+		COMMUNICATION_FIELDS,
+		before,
+		batch_size,
+	)
+
+	def get_comment_or_attachment_log_activity(comment):
+		if comment.comment_type == "Comment":
+			return get_comment_activity(comment, is_lead)
+		return get_attachment_log_activity(comment, is_lead)
+
+	doc = frappe.db.get_value(doctype, name, ["creation", "owner"], as_dict=True)
+	creation = []
+	if not before or (doc.creation, name) < (get_datetime(before[0]), before[1]):
+		creation.append(
+			(
+				doc.creation,
+				name,
+				{
+					"activity_type": "creation",
+					"creation": doc.creation,
+					"owner": doc.owner,
+					"data": creation_text,
+					"is_lead": is_lead,
+				},
+			)
+		)
+
+	return [
+		iter(creation),
+		iter_timeline_activities(changes, lambda change: get_change_activity(change, fields, is_lead)),
+		iter_timeline_activities(comments, get_comment_or_attachment_log_activity),
+		iter_timeline_activities(communications, lambda c: get_communication_activity(c, is_lead)),
+	]
+
+
+def iter_timeline_rows(table, condition, fields, before, batch_size):
+	"""
+	Yield rows of `table` matching `condition`, newest first and older than
+	`before`, querying `batch_size` rows at a time.
+	"""
+	while True:
+		query = frappe.qb.from_(table).select(*[table[field] for field in fields]).where(condition)
+		if before:
+			creation, name = before
+			query = query.where(
+				(table.creation < creation) | ((table.creation == creation) & (table.name < name))
+			)
+		rows = (
+			query.orderby(table.creation, order=Order.desc)
+			.orderby(table.name, order=Order.desc)
+			.limit(batch_size)
+			.run(as_dict=True)
+		)
+		yield from rows
+		if len(rows) < batch_size:
+			return
+		before = (rows[-1].creation, rows[-1].name)
+
+
+def iter_timeline_activities(rows, get_activity):
+	for row in rows:
+		if activity := get_activity(row):
+			yield row.creation, row.name, activity
+
+
 def get_deal_activities(name):
 	get_docinfo("", "CRM Deal", name)
 	docinfo = frappe.response["docinfo"]
@@ -26,14 +256,6 @@ def get_deal_activities(name):
 	deal_fields = {
 		field.fieldname: {"label": field.label, "options": field.options} for field in deal_meta.fields
 	}
-	avoid_fields = [
-		"lead",
-		"response_by",
-		"sla_creation",
-		"sla",
-		"first_response_time",
-		"first_responded_on",
-	]
 
 	doc = frappe.db.get_values("CRM Deal", name, ["creation", "owner", "lead"])[0]
 	lead = doc[2]
@@ -59,103 +281,28 @@ def get_deal_activities(name):
 		}
 	)
 
-	docinfo.versions.reverse()
+	# activities of the lead come with their attachments already
+	start = len(activities)
 
-	for version in docinfo.versions:
-		data = json.loads(version.data)
-		if not data.get("changed"):
-			continue
-
-		if change := data.get("changed")[0]:
-			field = deal_fields.get(change[0], None)
-
-			if not field or change[0] in avoid_fields or (not change[1] and not change[2]):
-				continue
-
-			field_label = field.get("label") or change[0]
-			field_option = field.get("options") or None
-
-			activity_type = "changed"
-			data = {
-				"field": change[0],
-				"field_label": field_label,
-				"old_value": change[1],
-				"value": change[2],
-			}
-
-			if not change[1] and change[2]:
-				activity_type = "added"
-				data = {
-					"field": change[0],
-					"field_label": field_label,
-					"value": change[2],
-				}
-			elif change[1] and not change[2]:
-				activity_type = "removed"
-				data = {
-					"field": change[0],
-					"field_label": field_label,
-					"value": change[1],
-				}
-
-		activity = {
-			"activity_type": activity_type,
-			"creation": version.creation,
-			"owner": version.owner,
-			"data": data,
-			"is_lead": False,
-			"options": field_option,
-		}
-		activities.append(activity)
+	for change in get_activity_log("CRM Deal", name):
+		if activity := get_change_activity(change, deal_fields, is_lead=False):
+			activities.append(activity)
 
 	for comment in docinfo.comments:
-		activity = {
-			"name": comment.name,
-			"activity_type": "comment",
-			"creation": comment.creation,
-			"owner": comment.owner,
-			"content": comment.content,
-			"attachments": get_attachments("Comment", comment.name),
-			"is_lead": False,
-		}
-		activities.append(activity)
+		activities.append(get_comment_activity(comment, is_lead=False))
 
 	for communication in docinfo.communications + docinfo.automated_messages:
-		activity = {
-			"activity_type": "communication",
-			"communication_type": communication.communication_type,
-			"communication_date": communication.communication_date or communication.creation,
-			"creation": communication.creation,
-			"data": {
-				"subject": communication.subject,
-				"content": communication.content,
-				"sender_full_name": communication.sender_full_name,
-				"sender": communication.sender,
-				"recipients": communication.recipients,
-				"cc": communication.cc,
-				"bcc": communication.bcc,
-				"attachments": get_attachments("Communication", communication.name),
-				"read_by_recipient": communication.read_by_recipient,
-				"delivery_status": communication.delivery_status,
-			},
-			"is_lead": False,
-		}
-		activities.append(activity)
+		activities.append(get_communication_activity(communication, is_lead=False))
 
 	for attachment_log in docinfo.attachment_logs:
-		activity = {
-			"name": attachment_log.name,
-			"activity_type": "attachment_log",
-			"creation": attachment_log.creation,
-			"owner": attachment_log.owner,
-			"data": parse_attachment_log(attachment_log.content, attachment_log.comment_type),
-			"is_lead": False,
-		}
-		activities.append(activity)
+		activities.append(get_attachment_log_activity(attachment_log, is_lead=False))
 
-	calls = calls + get_linked_calls(name).get("calls", [])
-	notes = notes + get_linked_notes(name) + get_linked_calls(name).get("notes", [])
-	tasks = tasks + get_linked_tasks(name) + get_linked_calls(name).get("tasks", [])
+	set_activity_attachments(activities[start:])
+
+	linked = get_linked_records(name)
+	calls = calls + linked["calls"]
+	notes = notes + linked["notes"]
+	tasks = tasks + linked["tasks"]
 	attachments = attachments + get_attachments("CRM Deal", name)
 
 	activities.sort(key=lambda x: x["creation"], reverse=True)
@@ -171,14 +318,6 @@ def get_lead_activities(name):
 	lead_fields = {
 		field.fieldname: {"label": field.label, "options": field.options} for field in lead_meta.fields
 	}
-	avoid_fields = [
-		"converted",
-		"response_by",
-		"sla_creation",
-		"sla",
-		"first_response_time",
-		"first_responded_on",
-	]
 
 	doc = frappe.db.get_values("CRM Lead", name, ["creation", "owner"])[0]
 	activities = [
@@ -191,103 +330,25 @@ def get_lead_activities(name):
 		}
 	]
 
-	docinfo.versions.reverse()
-
-	for version in docinfo.versions:
-		data = json.loads(version.data)
-		if not data.get("changed"):
-			continue
-
-		if change := data.get("changed")[0]:
-			field = lead_fields.get(change[0], None)
-
-			if not field or change[0] in avoid_fields or (not change[1] and not change[2]):
-				continue
-
-			field_label = field.get("label") or change[0]
-			field_option = field.get("options") or None
-
-			activity_type = "changed"
-			data = {
-				"field": change[0],
-				"field_label": field_label,
-				"old_value": change[1],
-				"value": change[2],
-			}
-
-			if not change[1] and change[2]:
-				activity_type = "added"
-				data = {
-					"field": change[0],
-					"field_label": field_label,
-					"value": change[2],
-				}
-			elif change[1] and not change[2]:
-				activity_type = "removed"
-				data = {
-					"field": change[0],
-					"field_label": field_label,
-					"value": change[1],
-				}
-
-		activity = {
-			"activity_type": activity_type,
-			"creation": version.creation,
-			"owner": version.owner,
-			"data": data,
-			"is_lead": True,
-			"options": field_option,
-		}
-		activities.append(activity)
+	for change in get_activity_log("CRM Lead", name):
+		if activity := get_change_activity(change, lead_fields, is_lead=True):
+			activities.append(activity)
 
 	for comment in docinfo.comments:
-		activity = {
-			"name": comment.name,
-			"activity_type": "comment",
-			"creation": comment.creation,
-			"owner": comment.owner,
-			"content": comment.content,
-			"attachments": get_attachments("Comment", comment.name),
-			"is_lead": True,
-		}
-		activities.append(activity)
+		activities.append(get_comment_activity(comment, is_lead=True))
 
 	for communication in docinfo.communications + docinfo.automated_messages:
-		activity = {
-			"activity_type": "communication",
-			"communication_type": communication.communication_type,
-			"communication_date": communication.communication_date or communication.creation,
-			"creation": communication.creation,
-			"data": {
-				"subject": communication.subject,
-				"content": communication.content,
-				"sender_full_name": communication.sender_full_name,
-				"sender": communication.sender,
-				"recipients": communication.recipients,
-				"cc": communication.cc,
-				"bcc": communication.bcc,
-				"attachments": get_attachments("Communication", communication.name),
-				"read_by_recipient": communication.read_by_recipient,
-				"delivery_status": communication.delivery_status,
-			},
-			"is_lead": True,
-		}
-		activities.append(activity)
+		activities.append(get_communication_activity(communication, is_lead=True))
 
 	for attachment_log in docinfo.attachment_logs:
-		activity = {
-			"name": attachment_log.name,
-			"activity_type": "attachment_log",
-			"creation": attachment_log.creation,
-			"owner": attachment_log.owner,
-			"data": parse_attachment_log(attachment_log.content, attachment_log.comment_type),
-			"is_lead": True,
-		}
-		activities.append(activity)
+		activities.append(get_attachment_log_activity(attachment_log, is_lead=True))
 
-	calls = get_linked_calls(name).get("calls", [])
-	notes = get_linked_notes(name) + get_linked_calls(name).get("notes", [])
-	tasks = get_linked_tasks(name) + get_linked_calls(name).get("tasks", [])
+	set_activity_attachments(activities)
+
+	linked = get_linked_records(name)
+	calls = linked["calls"]
+	notes = linked["notes"]
+	tasks = linked["tasks"]
 	attachments = get_attachments("CRM Lead", name)
 
 	activities.sort(key=lambda x: x["creation"], reverse=True)
@@ -296,27 +357,135 @@ def get_lead_activities(name):
 	return activities, calls, notes, tasks, attachments
 
 
+def get_activity_log(doctype, name):
+	return frappe.get_all(
+		"CRM Activity Log",
+		filters={"reference_doctype": doctype, "reference_docname": name},
+		fields=ACTIVITY_LOG_FIELDS,
+		order_by="creation asc",
+	)
+
+
+def get_change_activity(change, fields, is_lead):
+	"""
+	Build the timeline activity of a field change stored in CRM Activity Log.
+	"""
+	field = fields.get(change.field, None)
+	if not field:
+		return None
+
+	field_label = field.get("label") or change.field
+	old_value, value = json.loads(change.old_value), json.loads(change.value)
+
+	if change.activity_type == "changed":
+		data = {
+			"field": change.field,
+			"field_label": field_label,
+			"old_value": old_value,
+			"value": value,
+		}
+	else:
+		data = {
+			"field": change.field,
+			"field_label": field_label,
+			"value": value if change.activity_type == "added" else old_value,
+		}
+
+	return {
+		"activity_type": change.activity_type,
+		"creation": change.creation,
+		"owner": change.owner,
+		"data": data,
+		"is_lead": is_lead,
+		"options": field.get("options") or None,
+	}
+
+
+def get_comment_activity(comment, is_lead):
+	return {
+		"name": comment.name,
+		"activity_type": "comment",
+		"creation": comment.creation,
+		"owner": comment.owner,
+		"content": comment.content,
+		"attachments": [],
+		"is_lead": is_lead,
+	}
+
+
+def get_communication_activity(communication, is_lead):
+	return {
+		"name": communication.name,
+		"activity_type": "communication",
+		"communication_type": communication.communication_type,
+		"communication_date": communication.communication_date or communication.creation,
+		"creation": communication.creation,
+		"data": {
+			"subject": communication.subject,
+			"content": communication.content,
+			"sender_full_name": communication.sender_full_name,
+			"sender": communication.sender,
+			"recipients": communication.recipients,
+			"cc": communication.cc,
+			"bcc": communication.bcc,
+			"attachments": [],
+			"read_by_recipient": communication.read_by_recipient,
+			"delivery_status": communication.delivery_status,
+		},
+		"is_lead": is_lead,
+	}
+
+
+def get_attachment_log_activity(attachment_log, is_lead):
+	return {
+		"name": attachment_log.name,
+		"activity_type": "attachment_log",
+		"creation": attachment_log.creation,
+		"owner": attachment_log.owner,
+		"data": parse_attachment_log(attachment_log.content, attachment_log.comment_type),
+		"is_lead": is_lead,
+	}
+
+
 def get_attachments(doctype, name):
 	return (
 		frappe.db.get_all(
 			"File",
 			filters={"attached_to_doctype": doctype, "attached_to_name": name},
-			fields=[
-				"name",
-				"file_name",
-				"file_type",
-				"file_url",
-				"file_size",
-				"is_private",
-				"modified",
-				"creation",
-				"owner",
-			],
+			fields=ATTACHMENT_FIELDS,
 		)
 		or []
 	)
 
 
+def set_activity_attachments(activities):
+	"""
+	Load the attachments of all comment and communication `activities` with one query.
+	"""
+	attachments = {}
+	for activity in activities:
+		if activity["activity_type"] == "comment":
+			attachments[("Comment", activity["name"])] = activity["attachments"]
+		elif activity["activity_type"] == "communication":
+			attachments[("Communication", activity["name"])] = activity["data"]["attachments"]
+
+	if not attachments:
+		return
+
+	files = frappe.db.get_all(
+		"File",
+		filters={
+			"attached_to_doctype": ["in", ["Comment", "Communication"]],
+			"attached_to_name": ["in", list({name for _, name in attachments})],
+		},
+		fields=[*ATTACHMENT_FIELDS, "attached_to_doctype", "attached_to_name"],
+	)
+	for file in files:
+		reference = (file.pop("attached_to_doctype"), file.pop("attached_to_name"))
+		if reference in attachments:
+			attachments[reference].append(file)
+
+
 def handle_multiple_versions(versions):
 	activities = []
 	grouped_versions = []
@@ -354,113 +523,62 @@ def parse_grouped_versions(versions):
 	return version
 
 
-def get_linked_calls(name):
-	calls = frappe.db.get_all(
-		"CRM Call Log",
-		filters={"reference_docname": name},
-		fields=[
-			"name",
-			"caller",
-			"receiver",
-			"from",
-			"to",
-			"duration",
-			"start_time",
-			"end_time",
-			"status",
-			"type",
-			"recording_url",
-			"creation",
-			"note",
-		],
-	)
+def get_linked_records(name):
+	"""
+	Get calls, notes and tasks of a lead or deal in one pass. Notes and tasks
+	are the ones that reference `name` and the ones linked to its calls.
+	"""
+	CallLog = frappe.qb.DocType("CRM Call Log")
+	Link = frappe.qb.DocType("Dynamic Link")
+	call_fields = [
+		CallLog.name,
+		CallLog.caller,
+		CallLog.receiver,
+		CallLog["from"],
+		CallLog.to,
+		CallLog.duration,
+		CallLog.start_time,
+		CallLog.end_time,
+		CallLog.status,
+		CallLog.type,
+		CallLog.recording_url,
+		CallLog.creation,
+		CallLog.note,
+	]
 
-	linked_calls = frappe.db.get_all(
-		"Dynamic Link", filters={"link_name": name, "parenttype": "CRM Call Log"}, pluck="parent"
+	calls = (
+		frappe.qb.from_(CallLog)
+		.select(*call_fields)
+		.where(CallLog.reference_docname == name)
+		.run(as_dict=True)
 	)
 
-	notes = []
-	tasks = []
-
-	if linked_calls:
-		CallLog = frappe.qb.DocType("CRM Call Log")
-		Link = frappe.qb.DocType("Dynamic Link")
-		query = (
-			frappe.qb.from_(CallLog)
-			.select(
-				CallLog.name,
-				CallLog.caller,
-				CallLog.receiver,
-				CallLog["from"],
-				CallLog.to,
-				CallLog.duration,
-				CallLog.start_time,
-				CallLog.end_time,
-				CallLog.status,
-				CallLog.type,
-				CallLog.recording_url,
-				CallLog.creation,
-				CallLog.note,
-				Link.link_doctype,
-				Link.link_name,
-			)
-			.join(Link, JoinType.inner)
-			.on(Link.parent == CallLog.name)
-			.where(CallLog.name.isin(linked_calls))
-		)
-		_calls = query.run(as_dict=True)
-
-		for call in _calls:
-			if call.get("link_doctype") == "FCRM Note":
-				notes.append(call.link_name)
-			elif call.get("link_doctype") == "CRM Task":
-				tasks.append(call.link_name)
-
-		_calls = [call for call in _calls if call.get("link_doctype") not in ["FCRM Note", "CRM Task"]]
-		if _calls:
-			calls = calls + _calls
-
-	if notes:
-		notes = frappe.db.get_all(
-			"FCRM Note",
-			filters={"name": ("in", notes)},
-			fields=["name", "title", "content", "owner", "modified"],
-		)
-
-	if tasks:
-		tasks = frappe.db.get_all(
-			"CRM Task",
-			filters={"name": ("in", tasks)},
-			fields=[
-				"name",
-				"title",
-				"description",
-				"assigned_to",
-				"due_date",
-				"priority",
-				"status",
-				"modified",
-			],
-		)
-
-	calls = [parse_call_log(call) for call in calls] if calls else []
-
-	return {"calls": calls, "notes": notes, "tasks": tasks}
+	linked_calls = (
+		frappe.qb.from_(Link)
+		.select(Link.parent)
+		.where((Link.link_name == name) & (Link.parenttype == "CRM Call Log"))
+	)
+	_calls = (
+		frappe.qb.from_(CallLog)
+		.select(*call_fields, Link.link_doctype, Link.link_name)
+		.join(Link, JoinType.inner)
+		.on(Link.parent == CallLog.name)
+		.where(CallLog.name.isin(linked_calls))
+		.run(as_dict=True)
+	)
 
+	notes = [call.link_name for call in _calls if call.get("link_doctype") == "FCRM Note"]
+	tasks = [call.link_name for call in _calls if call.get("link_doctype") == "CRM Task"]
+	calls += [call for call in _calls if call.get("link_doctype") not in ["FCRM Note", "CRM Task"]]
 
-def get_linked_notes(name):
 	notes = frappe.db.get_all(
 		"FCRM Note",
-		filters={"reference_docname": name},
+		or_filters={"reference_docname": name, "name": ("in", notes or [""])},
 		fields=["name", "title", "content", "owner", "modified"],
 	)
-	return notes or []
-
-
-def get_linked_tasks(name):
 	tasks = frappe.db.get_all(
 		"CRM Task",
-		filters={"reference_docname": name},
+		or_filters={"reference_docname": name, "name": ("in", tasks or [""])},
 		fields=[
 			"name",
 			"title",
@@ -472,14 +590,15 @@ def get_linked_tasks(name):
 			"modified",
 		],
 	)
-	return tasks or []
+
+	return {"calls": parse_call_logs(calls), "notes": notes, "tasks": tasks}
 
 
 def parse_attachment_log(html, type):
-	soup = BeautifulSoup(html, "html.parser")
-	a_tag = soup.find("a")
 	type = "added" if type == "Attachment" else "removed"
-	if not a_tag:
+	a_tag = ANCHOR_PATTERN.search(html)
+	href = a_tag and HREF_PATTERN.search(a_tag.group(1))
+	if not href:
 		return {
 			"type": type,
 			"file_name": html.replace("Removed ", ""),
@@ -487,13 +606,11 @@ def parse_attachment_log(html, type):
 			"is_private": False,
 		}
 
-	is_private = False
-	if "private/files" in a_tag["href"]:
-		is_private = True
+	file_url = unescape(next(value for value in href.groups() if value is not None))
 
 	return {
 		"type": type,
-		"file_name": a_tag.text,
-		"file_url": a_tag["href"],
-		"is_private": is_private,
+		"file_name": unescape(TAG_PATTERN.sub("", a_tag.group(2))),
+		"file_url": file_url,
+		"is_private": "private/files" in file_url,
 	}
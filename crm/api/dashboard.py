@@ -6,6 +6,10 @@ from frappe import _
 from crm.fcrm.doctype.crm_dashboard.crm_dashboard import create_default_manager_dashboard
 from crm.utils import sales_user_only
 
+DASHBOARD_CACHE_KEY = "crm_dashboard"
+DASHBOARD_CACHE_VERSION_KEY = "crm_dashboard_version"
+DASHBOARD_CACHE_TTL = 24 * 60 * 60
+
 
 @frappe.whitelist()
 def reset_to_default():
@@ -24,12 +28,7 @@ def get_dashboard(from_date="", to_date="", user=""):
 		from_date = frappe.utils.get_first_day(from_date or frappe.utils.nowdate())
 		to_date = frappe.utils.get_last_day(to_date or frappe.utils.nowdate())
 
-	roles = frappe.get_roles(frappe.session.user)
-	is_sales_manager = "Sales Manager" in roles or "System Manager" in roles
-	is_sales_user = "Sales User" in roles and not is_sales_manager
-
-	if is_sales_user:
-		user = frappe.session.user
+	user, scope = get_effective_user(user)
 
 	dashboard = frappe.db.exists("CRM Dashboard", "Manager Dashboard")
 
@@ -41,13 +40,10 @@ def get_dashboard(from_date="", to_date="", user=""):
 	else:
 		layout = json.loads(frappe.db.get_value("CRM Dashboard", "Manager Dashboard", "layout") or "[]")
 
+	charts = get_cached_charts_data([l["name"] for l in layout], from_date, to_date, user, scope)
+
 	for l in layout:
-		method_name = f"get_{l['name']}"
-		if hasattr(frappe.get_attr("crm.api.dashboard"), method_name):
-			method = getattr(frappe.get_attr("crm.api.dashboard"), method_name)
-			l["data"] = method(from_date, to_date, user)
-		else:
-			l["data"] = None
+		l["data"] = charts.get(l["name"])
 
 	return layout
 
@@ -62,64 +58,283 @@ def get_chart(name, type, from_date="", to_date="", user=""):
 		from_date = frappe.utils.get_first_day(from_date or frappe.utils.nowdate())
 		to_date = frappe.utils.get_last_day(to_date or frappe.utils.nowdate())
 
+	user, scope = get_effective_user(user)
+
+	if hasattr(frappe.get_attr("crm.api.dashboard"), f"get_{name}"):
+		return get_cached_charts_data([name], from_date, to_date, user, scope)[name]
+	else:
+		return {"error": _("Invalid chart name")}
+
+
+def get_effective_user(user=""):
+	"""
+	Sales users only ever see their own numbers, whatever `user` they ask for.
+
+	:return: The user to filter charts by and the role scope it was resolved in
+	"""
 	roles = frappe.get_roles(frappe.session.user)
 	is_sales_manager = "Sales Manager" in roles or "System Manager" in roles
 	is_sales_user = "Sales User" in roles and not is_sales_manager
 
 	if is_sales_user:
-		user = frappe.session.user
+		return frappe.session.user, "sales_user"
+	return user, "sales_manager" if is_sales_manager else "other"
 
-	method_name = f"get_{name}"
-	if hasattr(frappe.get_attr("crm.api.dashboard"), method_name):
-		method = getattr(frappe.get_attr("crm.api.dashboard"), method_name)
-		return method(from_date, to_date, user)
-	else:
-		return {"error": _("Invalid chart name")}
+
+def get_charts_data(names, from_date, to_date, user=""):
+	"""
+	Compute the data of each chart in `names`, number cards of the same table together.
+	"""
+	module = frappe.get_attr("crm.api.dashboard")
+	number_cards = get_number_card_values([n for n in names if n in NUMBER_CARDS], from_date, to_date, user)
+
+	data = {}
+	for name in names:
+		method_name = f"get_{name}"
+		if name in number_cards:
+			data[name] = getattr(module, method_name)(from_date, to_date, user, values=number_cards[name])
+		elif hasattr(module, method_name):
+			data[name] = getattr(module, method_name)(from_date, to_date, user)
+		else:
+			data[name] = None
+	return data
 
 
-def get_total_leads(from_date, to_date, user=""):
+def get_cached_charts_data(names, from_date, to_date, user="", scope=""):
 	"""
-	Get lead count for the dashboard.
+	Get chart data from the dashboard cache, computing charts that are missing.
+
+	Entries cached before the last lead or deal change are stale. They are
+	returned as they are and refreshed in a background job.
 	"""
-	conds = ""
+	from_date, to_date = str(frappe.utils.getdate(from_date)), str(frappe.utils.getdate(to_date))
+	version = get_dashboard_cache_version()
+	lang = frappe.local.lang
+
+	data, missing, stale = {}, [], []
+	for name in names:
+		cached = frappe.cache.get_value(get_chart_cache_key(name, from_date, to_date, user, scope, lang))
+		if not cached:
+			missing.append(name)
+			continue
+		data[name] = cached["data"]
+		if cached["version"] != version:
+			stale.append(name)
+
+	if missing:
+		computed = get_charts_data(missing, from_date, to_date, user)
+		set_cached_charts_data(computed, from_date, to_date, user, scope, version, lang)
+		data.update(computed)
+
+	if stale:
+		frappe.enqueue(
+			"crm.api.dashboard.refresh_cached_charts_data",
+			queue="short",
+			job_id=get_chart_cache_key(",".join(stale), from_date, to_date, user, scope, lang),
+			deduplicate=True,
+			names=stale,
+			from_date=from_date,
+			to_date=to_date,
+			user=user,
+			scope=scope,
+			lang=lang,
+		)
+
+	return data
+
+
+def refresh_cached_charts_data(names, from_date, to_date, user="", scope="", lang=None):
+	"""
+	Recompute cached charts in the background, in the language of the user
+	that read them stale so they are cached under the key that user reads.
+	"""
+	lang = lang or frappe.local.lang
+	frappe.local.lang = lang
+	version = get_dashboard_cache_version()
+	set_cached_charts_data(
+		get_charts_data(names, from_date, to_date, user), from_date, to_date, user, scope, version, lang
+	)
+
+
+def set_cached_charts_data(data, from_date, to_date, user, scope, version, lang):
+	for name, chart_data in data.items():
+		frappe.cache.set_value(
+			get_chart_cache_key(name, from_date, to_date, user, scope, lang),
+			{"version": version, "data": chart_data},
+			expires_in_sec=DASHBOARD_CACHE_TTL,
+		)
+
+
+def get_chart_cache_key(name, from_date, to_date, user, scope, lang):
+	# chart titles are translated, so the language is part of the key too
+	return f"{DASHBOARD_CACHE_KEY}::{name}::{from_date}::{to_date}::{user or ''}::{scope}::{lang}"
+
+
+def get_dashboard_cache_version():
+	return frappe.cache.get_value(
+		DASHBOARD_CACHE_VERSION_KEY, generator=lambda: frappe.generate_hash(length=10)
+	)
+
+
+def clear_dashboard_cache(doc=None, method=None):
+	"""
+	Mark every cached chart as stale. Runs when a lead or deal is saved or
+	deleted, which also covers their status change logs.
+	"""
+	frappe.cache.set_value(DASHBOARD_CACHE_VERSION_KEY, frappe.generate_hash(length=10))
+
+
+# Number cards that `get_number_card_values` computes, grouped by the table they
+# scan. `{period}` expands to the current or previous period on `date_field`.
+NUMBER_CARD_SOURCES = {
+	"lead": {
+		"table": "`tabCRM Lead`",
+		"owner_field": "lead_owner",
+	},
+	"deal": {
+		"table": "`tabCRM Deal` d JOIN `tabCRM Deal Status` s ON d.status = s.name",
+		"owner_field": "d.deal_owner",
+	},
+}
+
+NUMBER_CARDS = {
+	"total_leads": {
+		"source": "lead",
+		"date_field": "creation",
+		"value": "COUNT(CASE WHEN {period} THEN name END)",
+	},
+	"ongoing_deals": {
+		"source": "deal",
+		"date_field": "d.creation",
+		"value": "COUNT(CASE WHEN {period} AND s.type NOT IN ('Won', 'Lost') THEN d.name END)",
+	},
+	"average_ongoing_deal_value": {
+		"source": "deal",
+		"date_field": "d.creation",
+		"value": "AVG(CASE WHEN {period} AND s.type NOT IN ('Won', 'Lost') THEN d.deal_value * IFNULL(d.exchange_rate, 1) END)",
+	},
+	"won_deals": {
+		"source": "deal",
+		"date_field": "d.closed_date",
+		"value": "COUNT(CASE WHEN {period} AND s.type = 'Won' THEN d.name END)",
+	},
+	"average_won_deal_value": {
+		"source": "deal",
+		"date_field": "d.closed_date",
+		"value": "AVG(CASE WHEN {period} AND s.type = 'Won' THEN d.deal_value * IFNULL(d.exchange_rate, 1) END)",
+	},
+	"average_deal_value": {
+		"source": "deal",
+		"date_field": "d.creation",
+		"value": "AVG(CASE WHEN {period} AND s.type != 'Lost' THEN d.deal_value * IFNULL(d.exchange_rate, 1) END)",
+	},
+	"average_time_to_close_a_lead": {
+		"source": "deal",
+		"date_field": "d.closed_date",
+		"value": "AVG(CASE WHEN {period} AND s.type = 'Won' THEN TIMESTAMPDIFF(DAY, COALESCE(l.creation, d.creation), d.closed_date) END)",
+		"join": "LEFT JOIN `tabCRM Lead` l ON d.lead = l.name",
+	},
+	"average_time_to_close_a_deal": {
+		"source": "deal",
+		"date_field": "d.closed_date",
+		"value": "AVG(CASE WHEN {period} AND s.type = 'Won' THEN TIMESTAMPDIFF(DAY, d.creation, d.closed_date) END)",
+	},
+}
+
+
+def get_number_card_values(names, from_date, to_date, user=""):
+	"""
+	Get current and previous period values of the number cards in `names`.
+
+	Cards that read the same table are computed together in a single scan and
+	the scans of all tables are sent as one statement.
+
+	:return: `{card_name: (current_value, prev_value)}`
+	"""
+	if not names:
+		return {}
 
 	diff = frappe.utils.date_diff(to_date, from_date)
 	if diff == 0:
 		diff = 1
+
 	params = {
 		"from_date": from_date,
 		"to_date": to_date,
 		"prev_from_date": frappe.utils.add_days(from_date, -diff),
 	}
-
 	if user:
-		conds += " AND lead_owner = %(user)s"
 		params["user"] = user
 
-	result = frappe.db.sql(
-		f"""
-		SELECT
-            COUNT(CASE
-                WHEN creation >= %(from_date)s AND creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-                {conds}
-                THEN name
-                ELSE NULL
-            END) as current_month_leads,
-
-            COUNT(CASE
-                WHEN creation >= %(prev_from_date)s AND creation < %(from_date)s
-                {conds}
-                THEN name
-                ELSE NULL
-            END) as prev_month_leads
-		FROM `tabCRM Lead`
-	""",
-		params,
-		as_dict=1,
+	cards_by_source = {}
+	for name in names:
+		cards_by_source.setdefault(NUMBER_CARDS[name]["source"], []).append(name)
+
+	queries = [get_number_card_query(source, cards, user) for source, cards in cards_by_source.items()]
+	values = {}
+	for row in run_number_card_queries(queries, params):
+		for name in names:
+			if name in row:
+				values[name] = (row[name] or 0, row[f"prev_{name}"] or 0)
+	return values
+
+
+def get_number_card_value(name, from_date, to_date, user=""):
+	return get_number_card_values([name], from_date, to_date, user)[name]
+
+
+def get_number_card_query(source, cards, user=""):
+	current_period = "{0} >= %(from_date)s AND {0} < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)"
+	prev_period = "{0} >= %(prev_from_date)s AND {0} < %(from_date)s"
+
+	columns, joins, date_fields = [], [], []
+	for name in cards:
+		card = NUMBER_CARDS[name]
+		date_field = card["date_field"]
+		columns.append(f"{card['value'].format(period=current_period.format(date_field))} as `{name}`")
+		columns.append(f"{card['value'].format(period=prev_period.format(date_field))} as `prev_{name}`")
+		if card.get("join") and card["join"] not in joins:
+			joins.append(card["join"])
+		if date_field not in date_fields:
+			date_fields.append(date_field)
+
+	# only rows that fall in either period can contribute to any of the cards
+	conds = " OR ".join(
+		f"({field} >= %(prev_from_date)s AND {field} < DATE_ADD(%(to_date)s, INTERVAL 1 DAY))"
+		for field in date_fields
 	)
+	conds = f"({conds})"
+	if user:
+		conds += f" AND {NUMBER_CARD_SOURCES[source]['owner_field']} = %(user)s"
+
+	return f"""
+		SELECT
+			{", ".join(columns)}
+		FROM {NUMBER_CARD_SOURCES[source]["table"]}
+		{" ".join(joins)}
+		WHERE {conds}
+	"""
+
 
-	current_month_leads = result[0].current_month_leads or 0
-	prev_month_leads = result[0].prev_month_leads or 0
+def run_number_card_queries(queries, params):
+	"""
+	Run `queries` and return their single result rows. Each query aggregates to
+	one row, so all of them are cross joined into one statement and one round trip.
+	"""
+	if len(queries) == 1:
+		return [frappe.db.sql(queries[0], params, as_dict=1)[0]]
+
+	joined = " CROSS JOIN ".join(f"({query}) `q{i}`" for i, query in enumerate(queries))
+	return [frappe.db.sql(f"SELECT * FROM {joined}", params, as_dict=1)[0]]
+
+
+def get_total_leads(from_date, to_date, user="", values=None):
+	"""
+	Get lead count for the dashboard.
+	"""
+	current_month_leads, prev_month_leads = values or get_number_card_value(
+		"total_leads", from_date, to_date, user
+	)
 
 	delta_in_percentage = (
 		(current_month_leads - prev_month_leads) / prev_month_leads * 100 if prev_month_leads else 0
@@ -134,54 +349,14 @@ def get_total_leads(from_date, to_date, user=""):
 	}
 
 
-def get_ongoing_deals(from_date, to_date, user=""):
+def get_ongoing_deals(from_date, to_date, user="", values=None):
 	"""
-	Get ongoing deal count for the dashboard, and also calculate average deal value for ongoing deals.
+	Get ongoing deal count for the dashboard.
 	"""
-	conds = ""
-
-	diff = frappe.utils.date_diff(to_date, from_date)
-	if diff == 0:
-		diff = 1
-
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-		"prev_from_date": frappe.utils.add_days(from_date, -diff),
-	}
-
-	if user:
-		conds += " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			COUNT(CASE
-				WHEN d.creation >= %(from_date)s AND d.creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-					AND s.type NOT IN ('Won', 'Lost')
-					{conds}
-				THEN d.name
-				ELSE NULL
-			END) as current_month_deals,
-
-			COUNT(CASE
-				WHEN d.creation >= %(prev_from_date)s AND d.creation < %(from_date)s
-					AND s.type NOT IN ('Won', 'Lost')
-					{conds}
-				THEN d.name
-				ELSE NULL
-			END) as prev_month_deals
-		FROM `tabCRM Deal` d
-		JOIN `tabCRM Deal Status` s ON d.status = s.name
-	""",
-		params,
-		as_dict=1,
+	current_month_deals, prev_month_deals = values or get_number_card_value(
+		"ongoing_deals", from_date, to_date, user
 	)
 
-	current_month_deals = result[0].current_month_deals or 0
-	prev_month_deals = result[0].prev_month_deals or 0
-
 	delta_in_percentage = (
 		(current_month_deals - prev_month_deals) / prev_month_deals * 100 if prev_month_deals else 0
 	)
@@ -195,54 +370,14 @@ def get_ongoing_deals(from_date, to_date, user=""):
 	}
 
 
-def get_average_ongoing_deal_value(from_date, to_date, user=""):
+def get_average_ongoing_deal_value(from_date, to_date, user="", values=None):
 	"""
-	Get ongoing deal count for the dashboard, and also calculate average deal value for ongoing deals.
+	Get average deal value of ongoing deals for the dashboard.
 	"""
-	conds = ""
-
-	diff = frappe.utils.date_diff(to_date, from_date)
-	if diff == 0:
-		diff = 1
-
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-		"prev_from_date": frappe.utils.add_days(from_date, -diff),
-	}
-
-	if user:
-		conds += " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			AVG(CASE
-				WHEN d.creation >= %(from_date)s AND d.creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-					AND s.type NOT IN ('Won', 'Lost')
-					{conds}
-				THEN d.deal_value * IFNULL(d.exchange_rate, 1)
-				ELSE NULL
-			END) as current_month_avg_value,
-
-			AVG(CASE
-				WHEN d.creation >= %(prev_from_date)s AND d.creation < %(from_date)s
-					AND s.type NOT IN ('Won', 'Lost')
-					{conds}
-				THEN d.deal_value * IFNULL(d.exchange_rate, 1)
-				ELSE NULL
-			END) as prev_month_avg_value
-		FROM `tabCRM Deal` d
-		JOIN `tabCRM Deal Status` s ON d.status = s.name
-    """,
-		params,
-		as_dict=1,
+	current_month_avg_value, prev_month_avg_value = values or get_number_card_value(
+		"average_ongoing_deal_value", from_date, to_date, user
 	)
 
-	current_month_avg_value = result[0].current_month_avg_value or 0
-	prev_month_avg_value = result[0].prev_month_avg_value or 0
-
 	avg_value_delta = current_month_avg_value - prev_month_avg_value if prev_month_avg_value else 0
 
 	return {
@@ -254,54 +389,14 @@ def get_average_ongoing_deal_value(from_date, to_date, user=""):
 	}
 
 
-def get_won_deals(from_date, to_date, user=""):
+def get_won_deals(from_date, to_date, user="", values=None):
 	"""
-	Get won deal count for the dashboard, and also calculate average deal value for won deals.
+	Get won deal count for the dashboard.
 	"""
-
-	diff = frappe.utils.date_diff(to_date, from_date)
-	if diff == 0:
-		diff = 1
-
-	conds = ""
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-		"prev_from_date": frappe.utils.add_days(from_date, -diff),
-	}
-
-	if user:
-		conds += " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			COUNT(CASE
-				WHEN d.closed_date >= %(from_date)s AND d.closed_date < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-					AND s.type = 'Won'
-					{conds}
-				THEN d.name
-				ELSE NULL
-			END) as current_month_deals,
-
-			COUNT(CASE
-				WHEN d.closed_date >= %(prev_from_date)s AND d.closed_date < %(from_date)s
-					AND s.type = 'Won'
-					{conds}
-				THEN d.name
-				ELSE NULL
-			END) as prev_month_deals
-		FROM `tabCRM Deal` d
-		JOIN `tabCRM Deal Status` s ON d.status = s.name
-		""",
-		params,
-		as_dict=1,
+	current_month_deals, prev_month_deals = values or get_number_card_value(
+		"won_deals", from_date, to_date, user
 	)
 
-	current_month_deals = result[0].current_month_deals or 0
-	prev_month_deals = result[0].prev_month_deals or 0
-
 	delta_in_percentage = (
 		(current_month_deals - prev_month_deals) / prev_month_deals * 100 if prev_month_deals else 0
 	)
@@ -315,54 +410,14 @@ def get_won_deals(from_date, to_date, user=""):
 	}
 
 
-def get_average_won_deal_value(from_date, to_date, user=""):
+def get_average_won_deal_value(from_date, to_date, user="", values=None):
 	"""
-	Get won deal count for the dashboard, and also calculate average deal value for won deals.
+	Get average deal value of won deals for the dashboard.
 	"""
-
-	diff = frappe.utils.date_diff(to_date, from_date)
-	if diff == 0:
-		diff = 1
-
-	conds = ""
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-		"prev_from_date": frappe.utils.add_days(from_date, -diff),
-	}
-
-	if user:
-		conds += " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			AVG(CASE
-				WHEN d.closed_date >= %(from_date)s AND d.closed_date < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-					AND s.type = 'Won'
-					{conds}
-				THEN d.deal_value * IFNULL(d.exchange_rate, 1)
-				ELSE NULL
-			END) as current_month_avg_value,
-
-			AVG(CASE
-				WHEN d.closed_date >= %(prev_from_date)s AND d.closed_date < %(from_date)s
-					AND s.type = 'Won'
-					{conds}
-				THEN d.deal_value * IFNULL(d.exchange_rate, 1)
-				ELSE NULL
-			END) as prev_month_avg_value
-		FROM `tabCRM Deal` d
-		JOIN `tabCRM Deal Status` s ON d.status = s.name
-		""",
-		params,
-		as_dict=1,
+	current_month_avg_value, prev_month_avg_value = values or get_number_card_value(
+		"average_won_deal_value", from_date, to_date, user
 	)
 
-	current_month_avg_value = result[0].current_month_avg_value or 0
-	prev_month_avg_value = result[0].prev_month_avg_value or 0
-
 	avg_value_delta = current_month_avg_value - prev_month_avg_value if prev_month_avg_value else 0
 
 	return {
@@ -374,54 +429,14 @@ def get_average_won_deal_value(from_date, to_date, user=""):
 	}
 
 
-def get_average_deal_value(from_date, to_date, user=""):
+def get_average_deal_value(from_date, to_date, user="", values=None):
 	"""
 	Get average deal value for the dashboard.
 	"""
-
-	diff = frappe.utils.date_diff(to_date, from_date)
-	if diff == 0:
-		diff = 1
-
-	conds = ""
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-		"prev_from_date": frappe.utils.add_days(from_date, -diff),
-	}
-
-	if user:
-		conds += " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			AVG(CASE
-				WHEN d.creation >= %(from_date)s AND d.creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-					AND s.type != 'Lost'
-					{conds}
-				THEN d.deal_value * IFNULL(d.exchange_rate, 1)
-				ELSE NULL
-			END) as current_month_avg,
-
-			AVG(CASE
-				WHEN d.creation >= %(prev_from_date)s AND d.creation < %(from_date)s
-					AND s.type != 'Lost'
-					{conds}
-				THEN d.deal_value * IFNULL(d.exchange_rate, 1)
-				ELSE NULL
-			END) as prev_month_avg
-		FROM `tabCRM Deal` AS d
-		JOIN `tabCRM Deal Status` s ON d.status = s.name
-		""",
-		params,
-		as_dict=1,
+	current_month_avg, prev_month_avg = values or get_number_card_value(
+		"average_deal_value", from_date, to_date, user
 	)
 
-	current_month_avg = result[0].current_month_avg or 0
-	prev_month_avg = result[0].prev_month_avg or 0
-
 	delta = current_month_avg - prev_month_avg if prev_month_avg else 0
 
 	return {
@@ -434,46 +449,14 @@ def get_average_deal_value(from_date, to_date, user=""):
 	}
 
 
-def get_average_time_to_close_a_lead(from_date, to_date, user=""):
+def get_average_time_to_close_a_lead(from_date, to_date, user="", values=None):
 	"""
-	Get average time to close deals for the dashboard.
+	Get average time to close leads for the dashboard.
 	"""
-
-	diff = frappe.utils.date_diff(to_date, from_date)
-	if diff == 0:
-		diff = 1
-
-	conds = ""
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-		"prev_from_date": frappe.utils.add_days(from_date, -diff),
-		"prev_to_date": from_date,
-	}
-
-	if user:
-		conds += " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			AVG(CASE WHEN d.closed_date >= %(from_date)s AND d.closed_date < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-				THEN TIMESTAMPDIFF(DAY, COALESCE(l.creation, d.creation), d.closed_date) END) as current_avg_lead,
-			AVG(CASE WHEN d.closed_date >= %(prev_from_date)s AND d.closed_date < %(prev_to_date)s
-				THEN TIMESTAMPDIFF(DAY, COALESCE(l.creation, d.creation), d.closed_date) END) as prev_avg_lead
-		FROM `tabCRM Deal` AS d
-		JOIN `tabCRM Deal Status` s ON d.status = s.name
-		LEFT JOIN `tabCRM Lead` l ON d.lead = l.name
-		WHERE d.closed_date IS NOT NULL AND s.type = 'Won'
-			{conds}
-		""",
-		params,
-		as_dict=1,
+	current_avg_lead, prev_avg_lead = values or get_number_card_value(
+		"average_time_to_close_a_lead", from_date, to_date, user
 	)
 
-	current_avg_lead = result[0].current_avg_lead or 0
-	prev_avg_lead = result[0].prev_avg_lead or 0
 	delta_lead = current_avg_lead - prev_avg_lead if prev_avg_lead else 0
 
 	return {
@@ -487,46 +470,14 @@ def get_average_time_to_close_a_lead(from_date, to_date, user=""):
 	}
 
 
-def get_average_time_to_close_a_deal(from_date, to_date, user=""):
+def get_average_time_to_close_a_deal(from_date, to_date, user="", values=None):
 	"""
 	Get average time to close deals for the dashboard.
 	"""
-
-	diff = frappe.utils.date_diff(to_date, from_date)
-	if diff == 0:
-		diff = 1
-
-	conds = ""
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-		"prev_from_date": frappe.utils.add_days(from_date, -diff),
-		"prev_to_date": from_date,
-	}
-
-	if user:
-		conds += " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			AVG(CASE WHEN d.closed_date >= %(from_date)s AND d.closed_date < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-				THEN TIMESTAMPDIFF(DAY, d.creation, d.closed_date) END) as current_avg_deal,
-			AVG(CASE WHEN d.closed_date >= %(prev_from_date)s AND d.closed_date < %(prev_to_date)s
-				THEN TIMESTAMPDIFF(DAY, d.creation, d.closed_date) END) as prev_avg_deal
-		FROM `tabCRM Deal` AS d
-		JOIN `tabCRM Deal Status` s ON d.status = s.name
-		LEFT JOIN `tabCRM Lead` l ON d.lead = l.name
-		WHERE d.closed_date IS NOT NULL AND s.type = 'Won'
-			{conds}
-		""",
-		params,
-		as_dict=1,
+	current_avg_deal, prev_avg_deal = values or get_number_card_value(
+		"average_time_to_close_a_deal", from_date, to_date, user
 	)
 
-	current_avg_deal = result[0].current_avg_deal or 0
-	prev_avg_deal = result[0].prev_avg_deal or 0
 	delta_deal = current_avg_deal - prev_avg_deal if prev_avg_deal else 0
 
 	return {
@@ -550,8 +501,7 @@ def get_sales_trend(from_date="", to_date="", user=""):
 	]
 	"""
 
-	lead_conds = ""
-	deal_conds = ""
+	conds = ""
 
 	if not from_date or not to_date:
 		from_date = frappe.utils.get_first_day(from_date or frappe.utils.nowdate())
@@ -560,42 +510,21 @@ def get_sales_trend(from_date="", to_date="", user=""):
 	params = {"from": from_date, "to": to_date}
 
 	if user:
-		lead_conds += " AND lead_owner = %(user)s"
-		deal_conds += " AND deal_owner = %(user)s"
+		conds += " AND record_owner = %(user)s"
 		params["user"] = user
 
 	result = frappe.db.sql(
 		f"""
 		SELECT
 			DATE_FORMAT(date, '%%Y-%%m-%%d') AS date,
-			SUM(leads) AS leads,
-			SUM(deals) AS deals,
-			SUM(won_deals) AS won_deals
-		FROM (
-			SELECT
-				DATE(creation) AS date,
-				COUNT(*) AS leads,
-				0 AS deals,
-				0 AS won_deals
-			FROM `tabCRM Lead`
-			WHERE DATE(creation) BETWEEN %(from)s AND %(to)s
-			{lead_conds}
-			GROUP BY DATE(creation)
-
-			UNION ALL
-
-			SELECT
-				DATE(d.creation) AS date,
-				0 AS leads,
-				COUNT(*) AS deals,
-				SUM(CASE WHEN s.type = 'Won' THEN 1 ELSE 0 END) AS won_deals
-			FROM `tabCRM Deal` d
-			JOIN `tabCRM Deal Status` s ON d.status = s.name
-			WHERE DATE(d.creation) BETWEEN %(from)s AND %(to)s
-			{deal_conds}
-			GROUP BY DATE(d.creation)
-		) AS daily
+			SUM(CASE WHEN reference_doctype = 'CRM Lead' THEN count ELSE 0 END) AS leads,
+			SUM(CASE WHEN reference_doctype = 'CRM Deal' THEN count ELSE 0 END) AS deals,
+			SUM(CASE WHEN reference_doctype = 'CRM Deal' AND status_type = 'Won' THEN count ELSE 0 END) AS won_deals
+		FROM `tabCRM Dashboard Rollup`
+		WHERE date BETWEEN %(from)s AND %(to)s
+		{conds}
 		GROUP BY date
+		HAVING leads != 0 OR deals != 0
 		ORDER BY date
 		""",
 		params,
@@ -738,7 +667,7 @@ def get_funnel_conversion(from_date="", to_date="", user=""):
 		f"""
 			SELECT COUNT(*) AS count
 			FROM `tabCRM Lead`
-			WHERE DATE(creation) BETWEEN %(from)s AND %(to)s
+			WHERE creation >= %(from)s AND creation < DATE_ADD(%(to)s, INTERVAL 1 DAY)
 			{lead_conds}
 		""",
 		lead_filters,
@@ -804,7 +733,7 @@ def get_deals_by_stage_axis(from_date="", to_date="", user=""):
 			s.type AS status_type
 		FROM `tabCRM Deal` AS d
 		JOIN `tabCRM Deal Status` s ON d.status = s.name
-		WHERE DATE(d.creation) BETWEEN %(from)s AND %(to)s AND s.type NOT IN ('Lost')
+		WHERE d.creation >= %(from)s AND d.creation < DATE_ADD(%(to)s, INTERVAL 1 DAY) AND s.type NOT IN ('Lost')
 		{deal_conds}
 		GROUP BY d.status
 		ORDER BY count DESC
@@ -857,7 +786,7 @@ def get_deals_by_stage_donut(from_date="", to_date="", user=""):
 			s.type AS status_type
 		FROM `tabCRM Deal` AS d
 		JOIN `tabCRM Deal Status` s ON d.status = s.name
-		WHERE DATE(d.creation) BETWEEN %(from)s AND %(to)s
+		WHERE d.creation >= %(from)s AND d.creation < DATE_ADD(%(to)s, INTERVAL 1 DAY)
 		{deal_conds}
 		GROUP BY d.status
 		ORDER BY count DESC
@@ -904,7 +833,7 @@ def get_lost_deal_reasons(from_date="", to_date="", user=""):
 			COUNT(*) AS count
 		FROM `tabCRM Deal` AS d
 		JOIN `tabCRM Deal Status` s ON d.status = s.name
-		WHERE DATE(d.creation) BETWEEN %(from)s AND %(to)s AND s.type = 'Lost'
+		WHERE d.creation >= %(from)s AND d.creation < DATE_ADD(%(to)s, INTERVAL 1 DAY) AND s.type = 'Lost'
 		{deal_conds}
 		GROUP BY d.lost_reason
 		HAVING reason IS NOT NULL AND reason != ''
@@ -950,18 +879,19 @@ def get_leads_by_source(from_date="", to_date="", user=""):
 	params = {"from": from_date, "to": to_date}
 
 	if user:
-		lead_conds += " AND lead_owner = %(user)s"
+		lead_conds += " AND record_owner = %(user)s"
 		params["user"] = user
 
 	result = frappe.db.sql(
 		f"""
 		SELECT
 			IFNULL(source, 'Empty') AS source,
-			COUNT(*) AS count
-		FROM `tabCRM Lead`
-		WHERE DATE(creation) BETWEEN %(from)s AND %(to)s
+			SUM(count) AS count
+		FROM `tabCRM Dashboard Rollup`
+		WHERE reference_doctype = 'CRM Lead' AND date BETWEEN %(from)s AND %(to)s
 		{lead_conds}
 		GROUP BY source
+		HAVING count != 0
 		ORDER BY count DESC
 		""",
 		params,
@@ -995,18 +925,19 @@ def get_deals_by_source(from_date="", to_date="", user=""):
 	params = {"from": from_date, "to": to_date}
 
 	if user:
-		deal_conds += " AND deal_owner = %(user)s"
+		deal_conds += " AND record_owner = %(user)s"
 		params["user"] = user
 
 	result = frappe.db.sql(
 		f"""
 		SELECT
 			IFNULL(source, 'Empty') AS source,
-			COUNT(*) AS count
-		FROM `tabCRM Deal`
-		WHERE DATE(creation) BETWEEN %(from)s AND %(to)s
+			SUM(count) AS count
+		FROM `tabCRM Dashboard Rollup`
+		WHERE reference_doctype = 'CRM Deal' AND date BETWEEN %(from)s AND %(to)s
 		{deal_conds}
 		GROUP BY source
+		HAVING count != 0
 		ORDER BY count DESC
 		""",
 		params,
@@ -1040,19 +971,20 @@ def get_deals_by_territory(from_date="", to_date="", user=""):
 	params = {"from": from_date, "to": to_date}
 
 	if user:
-		deal_conds += " AND d.deal_owner = %(user)s"
+		deal_conds += " AND record_owner = %(user)s"
 		params["user"] = user
 
 	result = frappe.db.sql(
 		f"""
 		SELECT
-			IFNULL(d.territory, 'Empty') AS territory,
-			COUNT(*) AS deals,
-			SUM(COALESCE(d.deal_value, 0) * IFNULL(d.exchange_rate, 1)) AS value
-		FROM `tabCRM Deal` AS d
-		WHERE DATE(d.creation) BETWEEN %(from)s AND %(to)s
+			IFNULL(territory, 'Empty') AS territory,
+			SUM(count) AS deals,
+			SUM(value) AS value
+		FROM `tabCRM Dashboard Rollup`
+		WHERE reference_doctype = 'CRM Deal' AND date BETWEEN %(from)s AND %(to)s
 		{deal_conds}
-		GROUP BY d.territory
+		GROUP BY territory
+		HAVING deals != 0
 		ORDER BY deals DESC, value DESC
 		""",
 		params,
@@ -1099,20 +1031,21 @@ def get_deals_by_salesperson(from_date="", to_date="", user=""):
 	params = {"from": from_date, "to": to_date}
 
 	if user:
-		deal_conds += " AND d.deal_owner = %(user)s"
+		deal_conds += " AND r.record_owner = %(user)s"
 		params["user"] = user
 
 	result = frappe.db.sql(
 		f"""
 		SELECT
-			IFNULL(u.full_name, d.deal_owner) AS salesperson,
-			COUNT(*)                           AS deals,
-			SUM(COALESCE(d.deal_value, 0) * IFNULL(d.exchange_rate, 1)) AS value
-		FROM `tabCRM Deal` AS d
-		LEFT JOIN `tabUser` AS u ON u.name = d.deal_owner
-		WHERE DATE(d.creation) BETWEEN %(from)s AND %(to)s
+			IFNULL(u.full_name, r.record_owner) AS salesperson,
+			SUM(r.count)                        AS deals,
+			SUM(r.value)                        AS value
+		FROM `tabCRM Dashboard Rollup` AS r
+		LEFT JOIN `tabUser` AS u ON u.name = r.record_owner
+		WHERE r.reference_doctype = 'CRM Deal' AND r.date BETWEEN %(from)s AND %(to)s
 		{deal_conds}
-		GROUP BY d.deal_owner
+		GROUP BY r.record_owner
+		HAVING deals != 0
 		ORDER BY deals DESC, value DESC
 		""",
 		params,
@@ -1181,7 +1114,7 @@ def get_deal_status_change_counts(from_date, to_date, deal_conds="", filters=Non
 			scl.to IS NOT NULL
 			AND scl.to != ''
 			AND s.type != 'Lost'
-			AND DATE(d.creation) BETWEEN %(from)s AND %(to)s
+			AND d.creation >= %(from)s AND d.creation < DATE_ADD(%(to)s, INTERVAL 1 DAY)
 			{deal_conds}
 		GROUP BY
 			scl.to, st.position
@@ -1,4 +1,8 @@
+import base64
+import hashlib
 import json
+import re
+import time
 
 import frappe
 from frappe import _
@@ -6,7 +10,7 @@ from frappe.custom.doctype.property_setter.property_setter import make_property_
 from frappe.desk.form.assign_to import set_status
 from frappe.model import no_value_fields
 from frappe.model.document import get_controller
-from frappe.utils import make_filter_tuple
+from frappe.utils import cint, make_filter_tuple
 from pypika import Criterion
 
 from crm.api.views import get_views
@@ -17,6 +21,41 @@ COUNT_NAME = (
     {"COUNT": "name", "as": "total_count"} if is_version_16() else "count(name) as total_count"
 )
 
+LIST_STD_FIELDS = [
+	{"label": "Name", "fieldtype": "Data", "fieldname": "name"},
+	{"label": "Created On", "fieldtype": "Datetime", "fieldname": "creation"},
+	{"label": "Last Modified", "fieldtype": "Datetime", "fieldname": "modified"},
+	{
+		"label": "Modified By",
+		"fieldtype": "Link",
+		"fieldname": "modified_by",
+		"options": "User",
+	},
+	{"label": "Assigned To", "fieldtype": "Text", "fieldname": "_assign"},
+	{"label": "Owner", "fieldtype": "Link", "fieldname": "owner", "options": "User"},
+	{"label": "Like", "fieldtype": "Data", "fieldname": "_liked_by"},
+]
+
+VIEW_META_CACHE_KEY = "crm_view_meta"
+VIEW_META_KEYS = ("fields", "views", "form_script", "list_script")
+
+ACTIVITY_COUNT_FIELDS = ("_email_count", "_comment_count", "_task_count", "_note_count")
+
+LIST_COUNT_CACHE_KEY = "crm_list_count"
+LIST_COUNT_CACHE_TTL = 30  # seconds
+# doctypes with list views whose counts are cached, cleared by their insert and delete hooks
+LIST_COUNT_CACHE_DOCTYPES = {
+	"CRM Lead",
+	"CRM Deal",
+	"Contact",
+	"CRM Organization",
+	"FCRM Note",
+	"CRM Task",
+	"CRM Call Log",
+}
+
+ORDER_BY_PATTERN = re.compile(r"^(?:`?tab[\w ]+`?\.)?`?(\w+)`?(?:\s+(asc|desc))?$", re.IGNORECASE)
+
 @frappe.whitelist()
 def sort_options(doctype: str):
 	fields = frappe.get_meta(doctype).fields
@@ -291,8 +330,13 @@ def get_data(
 	kanban_fields=[],
 	view=None,
 	default_filters=None,
+	skip_count=False,
+	estimated_count=False,
+	meta_version=None,
+	cursor=None,
 ):
 	custom_view = False
+	next_cursor = None
 	filters = frappe._dict(filters)
 	rows = frappe.parse_json(rows or "[]")
 	columns = frappe.parse_json(columns or "[]")
@@ -327,6 +371,7 @@ def get_data(
 		default_rows = _list.default_list_data().get("rows")
 
 	meta = frappe.get_meta(doctype)
+	view_meta = get_view_meta(doctype)
 
 	if view_type != "kanban":
 		if columns or rows:
@@ -344,17 +389,11 @@ def get_data(
 		if not rows:
 			rows = ["name"]
 
-		default_view_filters = {
-			"dt": doctype,
-			"type": view_type or "list",
-			"is_standard": 1,
-			"user": frappe.session.user,
-		}
+		standard_view = view_meta["standard_views"].get(view_type or "list")
 
-		if not custom_view and frappe.db.exists("CRM View Settings", default_view_filters):
-			list_view_settings = frappe.get_doc("CRM View Settings", default_view_filters)
-			columns = frappe.parse_json(list_view_settings.columns)
-			rows = frappe.parse_json(list_view_settings.rows)
+		if not custom_view and standard_view:
+			columns = frappe.parse_json(standard_view["columns"])
+			rows = frappe.parse_json(standard_view["rows"])
 			is_default = False
 		elif not custom_view or (is_default and hasattr(_list, "default_list_data")):
 			rows = default_rows
@@ -378,16 +417,22 @@ def get_data(
 		if group_by_field and group_by_field not in rows:
 			rows.append(group_by_field)
 
-		data = (
-			frappe.get_list(
-				doctype,
-				fields=rows,
-				filters=filters,
-				order_by=order_by,
-				page_length=page_length,
+		if cursor is not None and parse_order_by(order_by or "modified desc") is not None:
+			# the first page keeps the length already loaded, later pages add `page_length_count`
+			data, next_cursor = get_list_page(
+				doctype, rows, filters, order_by, page_length_count if cursor else page_length, cursor
+			)
+		else:
+			data = (
+				frappe.get_list(
+					doctype,
+					fields=rows,
+					filters=filters,
+					order_by=order_by,
+					page_length=page_length,
+				)
+				or []
 			)
-			or []
-		)
 		data = parse_list_data(data, doctype)
 
 	if view_type == "kanban":
@@ -418,18 +463,35 @@ def get_data(
 			if hasattr(_list, "default_kanban_settings"):
 				kanban_fields = json.loads(_list.default_kanban_settings().get("kanban_fields"))
 
+		# activity counts are not columns, they are counted separately for the cards
+		count_fields = [field for field in kanban_fields if field in ACTIVITY_COUNT_FIELDS]
 		for field in kanban_fields:
-			if field not in rows:
+			if field not in rows and field not in count_fields:
 				rows.append(field)
 
-		for kc in kanban_columns:
-			# Start with base filters
-			column_filters = []
+		# Convert the main filters once, every column starts with them
+		base_filters = convert_filter_to_tuple(doctype, filters) if filters else []
+
+		# Columns without a manual order are loaded together in one windowed query
+		batched_columns = []
+		if column_field and meta.has_field(column_field):
+			batched_columns = [
+				kc.get("name")
+				for kc in kanban_columns
+				if kc.get("name") and not kc.get("delete") and not kc.get("order")
+			]
+		page_lengths = {
+			kc.get("name"): kc.get("page_length", 20)
+			for kc in kanban_columns
+			if kc.get("name") in batched_columns
+		}
+		batched_data = get_kanban_columns_data(doctype, rows, base_filters, order_by, column_field, page_lengths)
+		column_counts = None
+		if batched_columns:
+			column_counts = get_kanban_column_counts(doctype, base_filters, column_field)
 
-			# Convert and add the main filters first
-			if filters:
-				base_filters = convert_filter_to_tuple(doctype, filters)
-				column_filters.extend(base_filters)
+		for kc in kanban_columns:
+			column_filters = list(base_filters)
 
 			# Add the column-specific filter
 			if column_field and kc.get("name"):
@@ -445,6 +507,8 @@ def get_data(
 					column_data = get_records_based_on_order(
 						doctype, rows, column_filters, page_length, order
 					)
+				elif batched_data is not None and kc.get("name") in batched_columns:
+					column_data = batched_data.get(kc.get("name"), [])
 				else:
 					column_data = frappe.get_list(
 						doctype,
@@ -454,11 +518,14 @@ def get_data(
 						page_length=page_length,
 					)
 
-				all_count = frappe.get_list(
-					doctype,
-					filters=column_filters,
-					fields=[COUNT_NAME],
-				)[0].total_count
+				if column_counts is not None and kc.get("name"):
+					all_count = column_counts.get(kc.get("name"), 0)
+				else:
+					all_count = frappe.get_list(
+						doctype,
+						filters=column_filters,
+						fields=[COUNT_NAME],
+					)[0].total_count
 
 				kc["all_count"] = all_count
 				kc["count"] = len(column_data)
@@ -471,40 +538,18 @@ def get_data(
 
 			data.append({"column": kc, "fields": kanban_fields, "data": column_data})
 
-	fields = frappe.get_meta(doctype).fields
-	fields = [field for field in fields if field.fieldtype not in no_value_fields]
-	fields = [
-		{
-			"label": _(field.label),
-			"fieldtype": field.fieldtype,
-			"fieldname": field.fieldname,
-			"options": field.options,
-		}
-		for field in fields
-		if field.label and field.fieldname
-	]
-
-	std_fields = [
-		{"label": "Name", "fieldtype": "Data", "fieldname": "name"},
-		{"label": "Created On", "fieldtype": "Datetime", "fieldname": "creation"},
-		{"label": "Last Modified", "fieldtype": "Datetime", "fieldname": "modified"},
-		{
-			"label": "Modified By",
-			"fieldtype": "Link",
-			"fieldname": "modified_by",
-			"options": "User",
-		},
-		{"label": "Assigned To", "fieldtype": "Text", "fieldname": "_assign"},
-		{"label": "Owner", "fieldtype": "Link", "fieldname": "owner", "options": "User"},
-		{"label": "Like", "fieldtype": "Data", "fieldname": "_liked_by"},
-	]
+		# activity counts shown on kanban cards, for all columns at once
+		if count_fields:
+			names = [d.get("name") for column in data for d in column["data"]]
+			counts = get_counts(doctype, names, count_fields)
+			for column in data:
+				for d in column["data"]:
+					d.update(counts.get(d.get("name"), {}))
 
-	for field in std_fields:
+	fields = view_meta["fields"]
+	for field in LIST_STD_FIELDS:
 		if field.get("fieldname") not in rows:
 			rows.append(field.get("fieldname"))
-		if field not in fields:
-			field["label"] = _(field["label"])
-			fields.append(field)
 
 	if not is_default and custom_view_name:
 		is_default = frappe.db.get_value("CRM View Settings", custom_view_name, "load_default_columns")
@@ -515,8 +560,10 @@ def get_data(
 			if type == "Select":
 				return [option for option in options.split("\n")]
 			else:
-				has_empty_values = any([not d.get(group_by_field) for d in data])
-				options = list(set([d.get(group_by_field) for d in data]))
+				# groups of all matching records, not only of the loaded page
+				values = get_group_by_values(doctype, filters, group_by_field)
+				has_empty_values = any([not v for v in values])
+				options = list(set(values))
 				options = [u for u in options if u]
 				if has_empty_values:
 					options.append("")
@@ -543,7 +590,11 @@ def get_data(
 					"options": get_options(field.get("fieldtype"), field.get("options")),
 				}
 
-	return {
+	total_count, is_estimated_count = None, False
+	if not cint(skip_count):
+		total_count, is_estimated_count = get_total_count(doctype, filters, cint(estimated_count))
+
+	res = {
 		"data": data,
 		"columns": columns,
 		"rows": rows,
@@ -556,15 +607,132 @@ def get_data(
 		"page_length": page_length,
 		"page_length_count": page_length_count,
 		"is_default": is_default,
-		"views": get_views(doctype),
-		"total_count": frappe.get_list(doctype, filters=filters, fields=[COUNT_NAME])[
-			0
-		].total_count,
+		"views": view_meta["views"],
+		"total_count": None if cint(skip_count) else total_count,
+		"is_estimated_count": is_estimated_count,
 		"row_count": len(data),
+		"form_script": view_meta["form_script"],
+		"list_script": view_meta["list_script"],
+		"view_type": view_type,
+		"meta_version": view_meta["version"],
+		"next_cursor": next_cursor,
+	}
+
+	# client already has this version of the view meta, send only what changes
+	if meta_version and meta_version == view_meta["version"]:
+		for key in VIEW_META_KEYS:
+			del res[key]
+
+	return res
+
+
+def get_view_meta(doctype):
+	"""
+	Get the parts of the list view response that only change when the doctype,
+	its views or its scripts change, cached per user and language
+	"""
+	return frappe.cache.hget(
+		f"{VIEW_META_CACHE_KEY}:{doctype}",
+		f"{frappe.session.user}:{frappe.local.lang}",
+		lambda: build_view_meta(doctype),
+	)
+
+
+def build_view_meta(doctype):
+	fields = frappe.get_meta(doctype).fields
+	fields = [field for field in fields if field.fieldtype not in no_value_fields]
+	fields = [
+		{
+			"label": _(field.label),
+			"fieldtype": field.fieldtype,
+			"fieldname": field.fieldname,
+			"options": field.options,
+		}
+		for field in fields
+		if field.label and field.fieldname
+	]
+
+	for field in LIST_STD_FIELDS:
+		if field not in fields:
+			fields.append({**field, "label": _(field["label"])})
+
+	view_meta = {
+		"fields": fields,
+		"views": get_views(doctype),
 		"form_script": get_form_script(doctype),
 		"list_script": get_form_script(doctype, "List"),
-		"view_type": view_type,
 	}
+	view_meta["version"] = hashlib.sha256(frappe.as_json(view_meta).encode()).hexdigest()
+
+	# latest standard view of every view type, columns and rows are parsed when used
+	view_meta["standard_views"] = {
+		view.type: view
+		for view in frappe.get_all(
+			"CRM View Settings",
+			filters={"dt": doctype, "is_standard": 1, "user": frappe.session.user},
+			fields=["type", "columns", "rows"],
+			order_by="modified asc",
+		)
+	}
+	return view_meta
+
+
+def clear_view_meta_cache(doctype):
+	frappe.cache.delete_value(f"{VIEW_META_CACHE_KEY}:{doctype}")
+
+
+def on_doctype_meta_update(doc, method=None):
+	"""Clear view meta of the doctype a DocType, Custom Field or Property Setter belongs to"""
+	if doc.doctype == "DocType":
+		clear_view_meta_cache(doc.name)
+	elif doc.doctype == "Custom Field":
+		clear_view_meta_cache(doc.dt)
+	elif doc.doctype == "Property Setter":
+		clear_view_meta_cache(doc.doc_type)
+
+
+def get_total_count(doctype, filters, estimated=False):
+	"""
+	Get the number of records matching `filters` for the current user.
+
+	Counts of `LIST_COUNT_CACHE_DOCTYPES` are cached per filter set and dropped
+	when a record is added or deleted. Updates that move a record in or out of
+	a filter don't clear the cache, so such counts can be off for at most
+	`LIST_COUNT_CACHE_TTL` seconds.
+
+	If `estimated` is set and the view is unfiltered and unrestricted for the
+	user, the row count is estimated from table statistics instead.
+
+	:return: Tuple of count and whether it is estimated
+	"""
+	if estimated and not filters and frappe.has_permission(doctype, "read") and not has_match_conditions(doctype):
+		return frappe.db.estimate_count(doctype), True
+
+	if doctype not in LIST_COUNT_CACHE_DOCTYPES:
+		return frappe.get_list(doctype, filters=filters, fields=[COUNT_NAME])[0].total_count, False
+
+	cache_key = f"{LIST_COUNT_CACHE_KEY}:{doctype}"
+	filters_hash = hashlib.sha256(frappe.as_json(filters).encode()).hexdigest()
+	field = f"{frappe.session.user}:{filters_hash}"
+
+	cached = frappe.cache.hget(cache_key, field)
+	if cached and cached["expires_at"] > time.time():
+		return cached["count"], False
+
+	count = frappe.get_list(doctype, filters=filters, fields=[COUNT_NAME])[0].total_count
+	frappe.cache.hset(cache_key, field, {"count": count, "expires_at": time.time() + LIST_COUNT_CACHE_TTL})
+	return count, False
+
+
+def has_match_conditions(doctype):
+	"""Check whether the current user's reads on `doctype` are restricted by user permissions or hooks"""
+	from frappe.model.db_query import DatabaseQuery
+
+	return bool(DatabaseQuery(doctype).build_match_conditions())
+
+
+def clear_total_count_cache(doc, method=None):
+	frappe.cache.delete_value(f"{LIST_COUNT_CACHE_KEY}:{doc.doctype}")
 
 
 def parse_list_data(data, doctype):
@@ -612,6 +780,202 @@ def get_records_based_on_order(doctype, rows, filters, page_length, order):
 	return records
 
 
+def get_kanban_column_counts(doctype, filters, column_field):
+	"""
+	Count records of every kanban column with a single GROUP BY over `column_field`
+	"""
+	counts = frappe.get_list(
+		doctype,
+		filters=filters,
+		fields=[column_field, COUNT_NAME],
+		group_by=column_field,
+	)
+	return {d.get(column_field): d.total_count for d in counts}
+
+
+def get_group_by_values(doctype, filters, group_by_field):
+	"""
+	Get the distinct values of `group_by_field` among all records matching `filters`
+	"""
+	return frappe.get_list(
+		doctype,
+		filters=filters,
+		fields=[group_by_field],
+		group_by=group_by_field,
+		pluck=group_by_field,
+	)
+
+
+def get_kanban_columns_data(doctype, rows, filters, order_by, column_field, page_lengths):
+	"""
+	Fetch the first `page_lengths[column]` records of every kanban column in one
+	query, ranking records per column with ROW_NUMBER instead of a query per column.
+
+	Returns `None` if `order_by` can't be used for ranking, in which case the
+	columns should be loaded one by one.
+	"""
+	if not page_lengths:
+		return {}
+
+	order_by_fields = parse_order_by(order_by or "modified desc")
+	if order_by_fields is None:
+		return None
+
+	fields = list(dict.fromkeys(rows))
+	extra_fields = []
+	for fieldname in [column_field, "name", *[f for f, _direction in order_by_fields]]:
+		if fieldname not in fields:
+			fields.append(fieldname)
+			extra_fields.append(fieldname)
+
+	# permission checks and filters are applied by get_list, window is applied on top of it
+	query = frappe.get_list(
+		doctype,
+		fields=fields,
+		filters=[*filters, [doctype, column_field, "in", list(page_lengths)]],
+		page_length=0,
+		run=False,
+	)
+	window_order_by = ", ".join(f"`_kanban`.`{f}` {direction}" for f, direction in order_by_fields)
+	data = frappe.db.sql(
+		f"""
+		select * from (
+			select `_kanban`.*, row_number() over (
+				partition by `_kanban`.`{column_field}` order by {window_order_by}, `_kanban`.`name` desc
+			) as `_kanban_row`
+			from ({query}) `_kanban`
+		) `_kanban_ranked`
+		where `_kanban_row` <= {cint(max(page_lengths.values()))}
+		order by `_kanban_row`
+		""",
+		as_dict=True,
+	)
+
+	res = {column: [] for column in page_lengths}
+	for d in data:
+		column = d.get(column_field)
+		if column in res and len(res[column]) < cint(page_lengths[column]):
+			for fieldname in ["_kanban_row", *extra_fields]:
+				d.pop(fieldname, None)
+			res[column].append(d)
+	return res
+
+
+def get_list_page(doctype, rows, filters, order_by, page_length, cursor=None):
+	"""
+	Fetch `page_length` records that come after `cursor` in `order_by` order.
+
+	Unlike growing `page_length`, every page is a single index range scan no
+	matter how far the user has scrolled. `name` is added as the last sort key
+	so that the order is total and the cursor points at exactly one record.
+
+	:param cursor: Cursor returned with the previous page, empty for the first page
+	:return: Records and the cursor of the next page, `None` on the last page
+	"""
+	page_length = cint(page_length) or 20
+	order_by_fields = parse_order_by(order_by or "modified desc")
+	if order_by_fields is None:
+		frappe.throw(_("Cursor pagination is not supported for this sort order"))
+	if "name" not in [f for f, _direction in order_by_fields]:
+		order_by_fields.append(("name", order_by_fields[-1][1]))
+
+	fields = list(dict.fromkeys(rows))
+	extra_fields = [f for f, _direction in order_by_fields if f not in fields]
+
+	# permission checks and filters are applied by get_list, keyset is applied on top of it
+	query = frappe.get_list(
+		doctype,
+		fields=fields + extra_fields,
+		filters=filters,
+		page_length=0,
+		run=False,
+	)
+	conditions, values = "", {}
+	if cursor:
+		conditions, values = get_keyset_condition(order_by_fields, decode_cursor(cursor, len(order_by_fields)))
+		conditions = f"where {conditions}"
+
+	data = frappe.db.sql(
+		f"""
+		select * from ({query.replace("%", "%%")}) `_list`
+		{conditions}
+		order by {", ".join(f"`_list`.`{f}` {direction}" for f, direction in order_by_fields)}
+		limit {page_length + 1}
+		""",
+		values,
+		as_dict=True,
+	)
+
+	next_cursor = None
+	if len(data) > page_length:
+		data = data[:page_length]
+		next_cursor = encode_cursor([data[-1].get(f) for f, _direction in order_by_fields])
+
+	for d in data:
+		for fieldname in extra_fields:
+			d.pop(fieldname, None)
+	return data, next_cursor
+
+
+def get_keyset_condition(order_by_fields, cursor_values):
+	"""
+	Build the condition that selects records after the record with `cursor_values`.
+
+	Follows MariaDB ordering where NULL comes first in ascending and last in
+	descending order, e.g. for `a asc, name desc` and a cursor of `(x, y)`:
+	`a > x or (a = x and name < y)`
+	"""
+	values = {}
+	condition = None
+	for i in reversed(range(len(order_by_fields))):
+		fieldname, direction = order_by_fields[i]
+		value = cursor_values[i]
+		column = f"`_list`.`{fieldname}`"
+		param = f"cursor_{i}"
+		values[param] = value
+
+		if value is None:
+			after = f"{column} is not null" if direction == "asc" else None
+			equal = f"{column} is null"
+		else:
+			after = f"{column} > %({param})s" if direction == "asc" else f"({column} < %({param})s or {column} is null)"
+			equal = f"{column} = %({param})s"
+
+		if condition:
+			condition = f"({equal} and {condition})" if not after else f"({after} or ({equal} and {condition}))"
+		else:
+			condition = after or "1 = 0"
+	return condition, values
+
+
+def encode_cursor(values):
+	return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(cursor, length):
+	try:
+		values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+	except ValueError:
+		values = None
+	if not isinstance(values, list) or len(values) != length:
+		frappe.throw(_("Invalid cursor"))
+	return values
+
+
+def parse_order_by(order_by):
+	"""
+	Split `order_by` into `(fieldname, direction)` tuples,
+	`None` if it is anything other than a list of plain fields
+	"""
+	res = []
+	for part in order_by.split(","):
+		match = ORDER_BY_PATTERN.match(part.strip())
+		if not match:
+			return None
+		res.append((match.group(1), (match.group(2) or "asc").lower()))
+	return res
+
+
 @frappe.whitelist()
 def get_fields_meta(doctype, restricted_fieldtypes=None, as_array=False, only_required=False):
 	not_allowed_fieldtypes = [
@@ -720,36 +1084,58 @@ def get_fields(doctype: str, allow_all_fieldtypes: bool = False):
 
 
 def getCounts(d, doctype):
-	d["_email_count"] = (
-		frappe.db.count(
+	d.update(get_counts(doctype, [d.get("name")]).get(d.get("name")))
+	return d
+
+
+@frappe.whitelist()
+def get_activity_counts(doctype: str, names: list | str):
+	"""
+	Get email, comment, task and note counts of every record in `names`
+
+	:param doctype: Reference doctype of the activities
+	:param names: Names of the records
+	:return: Counts keyed by record name
+	"""
+	names = frappe.parse_json(names)
+	names = frappe.get_list(doctype, filters={"name": ["in", names]}, pluck="name") if names else []
+	return get_counts(doctype, names)
+
+
+def get_counts(doctype, names, fields=ACTIVITY_COUNT_FIELDS):
+	"""
+	Count activities of all `names` together, with one grouped query per source
+	doctype instead of one query per source for every record. Only the sources
+	of `fields` are counted.
+	"""
+	res = {name: dict.fromkeys(fields, 0) for name in names}
+	if not names:
+		return res
+
+	sources = [
+		(
+			"_email_count",
 			"Communication",
-			filters={
-				"reference_doctype": doctype,
-				"reference_name": d.get("name"),
-				"communication_type": "Communication",
-			},
+			"reference_name",
+			{"communication_type": ["in", ["Communication", "Automated Message"]]},
+		),
+		("_comment_count", "Comment", "reference_name", {"comment_type": "Comment"}),
+		("_task_count", "CRM Task", "reference_docname", {}),
+		("_note_count", "FCRM Note", "reference_docname", {}),
+	]
+	for key, source, reference_field, filters in sources:
+		if key not in fields:
+			continue
+		counts = frappe.get_all(
+			source,
+			filters={"reference_doctype": doctype, reference_field: ["in", names], **filters},
+			fields=[reference_field, COUNT_NAME],
+			group_by=reference_field,
 		)
-		or 0
-	)
-	d["_email_count"] = d["_email_count"] + frappe.db.count(
-		"Communication",
-		filters={
-			"reference_doctype": doctype,
-			"reference_name": d.get("name"),
-			"communication_type": "Automated Message",
-		},
-	)
-	d["_comment_count"] = frappe.db.count(
-		"Comment",
-		filters={"reference_doctype": doctype, "reference_name": d.get("name"), "comment_type": "Comment"},
-	)
-	d["_task_count"] = frappe.db.count(
-		"CRM Task", filters={"reference_doctype": doctype, "reference_docname": d.get("name")}
-	)
-	d["_note_count"] = frappe.db.count(
-		"FCRM Note", filters={"reference_doctype": doctype, "reference_docname": d.get("name")}
-	)
-	return d
+		for d in counts:
+			if d.get(reference_field) in res:
+				res[d.get(reference_field)][key] = d.total_count
+	return res
 
 
 @frappe.whitelist()
@@ -1,74 +1,147 @@
 import frappe
 from frappe.query_builder import Order
+from frappe.query_builder.functions import Count
+from frappe.utils import cint, now
+
+from crm.api.doc import decode_cursor, encode_cursor
+from crm.fcrm.doctype.crm_call_log.crm_call_log import get_user_profile, load_user_profiles
+
+UNREAD_NOTIFICATIONS_CACHE_KEY = "crm_unread_notifications"
+
+
+@frappe.whitelist()
+def get_notifications(limit=20, cursor=None):
+	"""
+	Get the newest `limit` notifications of the session user, older than `cursor`.
+
+	:return: `{"notifications": [...], "next_cursor": cursor of the next page or None}`
+	"""
+	limit = cint(limit) or 20
+	Notification = frappe.qb.DocType("CRM Notification")
+	query = (
+		frappe.qb.from_(Notification)
+		.select(
+			Notification.name,
+			Notification.creation,
+			Notification.from_user,
+			Notification.to_user,
+			Notification.type,
+			Notification.read,
+			Notification.message,
+			Notification.comment,
+			Notification.notification_text,
+			Notification.notification_type_doctype,
+			Notification.notification_type_doc,
+			Notification.reference_doctype,
+			Notification.reference_name,
+		)
+		.where(Notification.to_user == frappe.session.user)
+		.orderby(Notification.creation, order=Order.desc)
+		.orderby(Notification.name, order=Order.desc)
+		.limit(limit + 1)
+	)
+	if cursor:
+		creation, name = decode_cursor(cursor, 2)
+		query = query.where(
+			(Notification.creation < creation)
+			| ((Notification.creation == creation) & (Notification.name < name))
+		)
+	notifications = query.run(as_dict=True)
+
+	next_cursor = None
+	if len(notifications) > limit:
+		notifications = notifications[:limit]
+		next_cursor = encode_cursor([notifications[-1].creation, notifications[-1].name])
+
+	load_user_profiles(notification.from_user for notification in notifications)
+
+	_notifications = []
+	for notification in notifications:
+		_notifications.append(
+			{
+				"name": notification.name,
+				"creation": notification.creation,
+				"from_user": {
+					"name": notification.from_user,
+					"full_name": get_user_profile(notification.from_user)[0],
+				},
+				"type": notification.type,
+				"to_user": notification.to_user,
+				"read": notification.read,
+				"hash": get_hash(notification),
+				"comment": notification.comment,
+				"notification_text": notification.notification_text,
+				"notification_type_doctype": notification.notification_type_doctype,
+				"notification_type_doc": notification.notification_type_doc,
+				"reference_doctype": ("deal" if notification.reference_doctype == "CRM Deal" else "lead"),
+				"reference_name": notification.reference_name,
+				"route_name": ("Deal" if notification.reference_doctype == "CRM Deal" else "Lead"),
+			}
+		)
+
+	return {"notifications": _notifications, "next_cursor": next_cursor}
 
 
 @frappe.whitelist()
-def get_notifications():
-    Notification = frappe.qb.DocType("CRM Notification")
-    query = (
-        frappe.qb.from_(Notification)
-        .select("*")
-        .where(Notification.to_user == frappe.session.user)
-        .orderby("creation", order=Order.desc)
-    )
-    notifications = query.run(as_dict=True)
-
-    _notifications = []
-    for notification in notifications:
-        _notifications.append(
-            {
-                "creation": notification.creation,
-                "from_user": {
-                    "name": notification.from_user,
-                    "full_name": frappe.get_value(
-                        "User", notification.from_user, "full_name"
-                    ),
-                },
-                "type": notification.type,
-                "to_user": notification.to_user,
-                "read": notification.read,
-                "hash": get_hash(notification),
-                "notification_text": notification.notification_text,
-                "notification_type_doctype": notification.notification_type_doctype,
-                "notification_type_doc": notification.notification_type_doc,
-                "reference_doctype": (
-                    "deal" if notification.reference_doctype == "CRM Deal" else "lead"
-                ),
-                "reference_name": notification.reference_name,
-                "route_name": (
-                    "Deal" if notification.reference_doctype == "CRM Deal" else "Lead"
-                ),
-            }
-        )
-
-    return _notifications
+def get_unread_notifications_count():
+	"""
+	Get the number of unread notifications of the session user. The count is
+	kept in cache and only recounted after the user's notifications change.
+	"""
+	user = frappe.session.user
+
+	def count_unread():
+		Notification = frappe.qb.DocType("CRM Notification")
+		return (
+			frappe.qb.from_(Notification)
+			.select(Count("*"))
+			.where((Notification.to_user == user) & (Notification.read == 0))
+			.run()[0][0]
+		)
+
+	return frappe.cache.hget(UNREAD_NOTIFICATIONS_CACHE_KEY, user, count_unread)
+
+
+def clear_unread_notifications_count(user):
+	frappe.cache.hdel(UNREAD_NOTIFICATIONS_CACHE_KEY, user)
 
 
 @frappe.whitelist()
 def mark_as_read(user=None, doc=None):
-    user = user or frappe.session.user
-    filters = {"to_user": user, "read": False}
-    or_filters = []
-    if doc:
-        or_filters = [
-            {"comment": doc},
-            {"notification_type_doc": doc},
-        ]
-    for n in frappe.get_all("CRM Notification", filters=filters, or_filters=or_filters):
-        d = frappe.get_doc("CRM Notification", n.name)
-        d.read = True
-        d.save()
+	"""
+	Mark the unread notifications of `user` as read with a single UPDATE,
+	only those of `doc` if it is given, and notify the user once.
+	Only a System Manager can mark the notifications of another user.
+	"""
+	if user and user != frappe.session.user:
+		frappe.only_for("System Manager")
+	user = user or frappe.session.user
+	Notification = frappe.qb.DocType("CRM Notification")
+	query = (
+		frappe.qb.update(Notification)
+		.set(Notification.read, 1)
+		.set(Notification.modified, now())
+		.set(Notification.modified_by, frappe.session.user)
+		.where((Notification.to_user == user) & (Notification.read == 0))
+	)
+	if doc:
+		query = query.where((Notification.comment == doc) | (Notification.notification_type_doc == doc))
+	query.run()
+
+	clear_unread_notifications_count(user)
+	frappe.publish_realtime("crm_notification", user=user, after_commit=True)
+
 
 def get_hash(notification):
-    _hash = ""
-    if notification.type == "Mention" and notification.notification_type_doc:
-        _hash = "#" + notification.notification_type_doc
-
-    if notification.type == "WhatsApp":
-        _hash = "#whatsapp"
-
-    if notification.type == "Assignment" and notification.notification_type_doctype == "CRM Task":
-        _hash = "#tasks"
-        if "has been removed by" in notification.message:
-            _hash = ""
-    return _hash
\ No newline at end of file
+	_hash = ""
+	if notification.type == "Mention" and notification.notification_type_doc:
+		_hash = "#" + notification.notification_type_doc
+
+	if notification.type == "WhatsApp":
+		_hash = "#whatsapp"
+
+	if notification.type == "Assignment" and notification.notification_type_doctype == "CRM Task":
+		_hash = "#tasks"
+		if "has been removed by" in notification.message:
+			_hash = ""
+	return _hash
@@ -0,0 +1,116 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import json
+
+import frappe
+from frappe.model.document import Document
+
+# doctypes whose field changes are shown in the timeline, with the fields left out
+ACTIVITY_LOG_DOCTYPES = {
+	"CRM Deal": ["lead", "response_by", "sla_creation", "sla", "first_response_time", "first_responded_on"],
+	"CRM Lead": [
+		"converted",
+		"response_by",
+		"sla_creation",
+		"sla",
+		"first_response_time",
+		"first_responded_on",
+	],
+}
+
+ACTIVITY_LOG_FIELDS = [
+	"name",
+	"creation",
+	"modified",
+	"owner",
+	"modified_by",
+	"reference_doctype",
+	"reference_docname",
+	"activity_type",
+	"field",
+	"old_value",
+	"value",
+]
+
+
+class CRMActivityLog(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("CRM Activity Log", ["reference_docname", "reference_doctype", "creation"])
+
+
+def add_version_to_activity_log(doc, method=None):
+	"""
+	Store the field change a Version of a lead or deal shows in the timeline,
+	classified once here instead of on every timeline read.
+	"""
+	if doc.ref_doctype not in ACTIVITY_LOG_DOCTYPES:
+		return
+	if row := get_activity_log_row(doc):
+		frappe.db.bulk_insert("CRM Activity Log", ACTIVITY_LOG_FIELDS, [row], ignore_duplicates=True)
+
+
+def remove_from_activity_log(doc, method=None):
+	frappe.db.delete("CRM Activity Log", {"reference_doctype": doc.doctype, "reference_docname": doc.name})
+
+
+def get_activity_log_row(version) -> tuple | None:
+	"""
+	Get the activity log row of `version`, named after it, or None if the
+	timeline does not show it.
+	"""
+	data = json.loads(version.data)
+	if not data.get("changed"):
+		return None
+
+	fieldname, old_value, value = data.get("changed")[0]
+	if fieldname in ACTIVITY_LOG_DOCTYPES[version.ref_doctype] or (not old_value and not value):
+		return None
+	if not frappe.get_meta(version.ref_doctype).has_field(fieldname):
+		return None
+
+	activity_type = "changed"
+	if not old_value and value:
+		activity_type = "added"
+	elif old_value and not value:
+		activity_type = "removed"
+
+	return (
+		version.name,
+		version.creation,
+		version.creation,
+		version.owner,
+		version.owner,
+		version.ref_doctype,
+		version.docname,
+		activity_type,
+		fieldname,
+		json.dumps(old_value),
+		json.dumps(value),
+	)
+
+
+def backfill_activity_log(batch_size=1000):
+	"""
+	Add the versions of all leads and deals to the activity log. Versions
+	already in it are skipped, so this can be run again safely.
+	"""
+	last_name = ""
+	while True:
+		versions = frappe.get_all(
+			"Version",
+			filters={"ref_doctype": ["in", list(ACTIVITY_LOG_DOCTYPES)], "name": [">", last_name]},
+			fields=["name", "creation", "owner", "ref_doctype", "docname", "data"],
+			order_by="name asc",
+			limit=batch_size,
+		)
+		if not versions:
+			break
+
+		rows = [row for version in versions if (row := get_activity_log_row(version))]
+		frappe.db.bulk_insert("CRM Activity Log", ACTIVITY_LOG_FIELDS, rows, ignore_duplicates=True)
+		frappe.db.commit()
+		last_name = versions[-1].name
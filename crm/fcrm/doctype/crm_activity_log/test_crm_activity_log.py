@@ -0,0 +1,73 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import json
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from crm.api.activities import get_activities
+
+
+def get_activity_log(lead):
+	return frappe.get_all(
+		"CRM Activity Log",
+		filters={"reference_doctype": "CRM Lead", "reference_docname": lead},
+		fields=["name", "activity_type", "field", "old_value", "value"],
+		order_by="creation asc",
+	)
+
+
+class IntegrationTestCRMActivityLog(IntegrationTestCase):
+	def test_versions_of_a_lead_are_added_to_the_activity_log(self):
+		lead = frappe.get_doc({"doctype": "CRM Lead", "first_name": "Activity"}).insert()
+		lead.website = "example.com"
+		lead.save()
+		lead.website = ""
+		lead.save()
+		lead.job_title = "Buyer"
+		lead.save()
+		lead.job_title = "Manager"
+		lead.save()
+		# changes of fields the timeline leaves out are not logged
+		lead.db_set("converted", 1, update_modified=False)
+		lead.reload()
+		lead.converted = 0
+		lead.save()
+
+		log = get_activity_log(lead.name)
+		self.assertEqual(
+			[(row.activity_type, row.field) for row in log],
+			[("added", "website"), ("removed", "website"), ("added", "job_title"), ("changed", "job_title")],
+		)
+		self.assertEqual(json.loads(log[3].old_value), "Buyer")
+		self.assertEqual(json.loads(log[3].value), "Manager")
+		# rows are named after their version, so a version is never added twice
+		self.assertTrue(frappe.db.exists("Version", log[3].name))
+
+	def test_timeline_is_read_from_the_activity_log(self):
+		lead = frappe.get_doc(
+			{"doctype": "CRM Lead", "first_name": "Activity", "job_title": "Buyer"}
+		).insert()
+		lead.job_title = "Manager"
+		lead.save()
+
+		activities = get_activities(lead.name)[0]
+		changes = [a for a in activities if a["activity_type"] == "changed"]
+		self.assertEqual(len(changes), 1)
+		self.assertEqual(changes[0]["data"]["field"], "job_title")
+		self.assertEqual(changes[0]["data"]["old_value"], "Buyer")
+		self.assertEqual(changes[0]["data"]["value"], "Manager")
+
+		# rows not backed by a version still show, the timeline no longer reads versions
+		frappe.db.delete("Version", {"ref_doctype": "CRM Lead", "docname": lead.name})
+		self.assertEqual(get_activities(lead.name)[0], activities)
+
+	def test_activity_log_is_removed_with_its_lead(self):
+		lead = frappe.get_doc({"doctype": "CRM Lead", "first_name": "Activity"}).insert()
+		lead.job_title = "Manager"
+		lead.save()
+		self.assertTrue(get_activity_log(lead.name))
+
+		lead.delete()
+		self.assertFalse(get_activity_log(lead.name))
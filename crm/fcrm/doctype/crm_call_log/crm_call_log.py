@@ -4,7 +4,7 @@
 import frappe
 from frappe.model.document import Document
 
-from crm.integrations.api import get_contact_by_phone_number
+from crm.integrations.api import get_contact_by_phone_number, get_contacts_by_phone_numbers
 from crm.utils import seconds_to_duration
 
 
@@ -81,7 +81,7 @@ class CRMCallLog(Document):
 		return {"columns": columns, "rows": rows}
 
 	def parse_list_data(calls):
-		return [parse_call_log(call) for call in calls] if calls else []
+		return parse_call_logs(calls)
 
 	def has_link(self, doctype, name):
 		for link in self.links:
@@ -95,17 +95,64 @@ class CRMCallLog(Document):
 		self.append("links", {"link_doctype": reference_doctype, "link_name": reference_name})
 
 
-def parse_call_log(call):
+def parse_call_logs(calls):
+	"""
+	Parse `calls`, loading the profiles of all their callers and receivers and
+	the contacts of all their phone numbers at once.
+	"""
+	if not calls:
+		return []
+	load_user_profiles([user for call in calls for user in (call.get("caller"), call.get("receiver"))])
+	contacts = get_contacts_by_phone_numbers(list({get_contact_phone_number(call) for call in calls}))
+	return [parse_call_log(call, contacts) for call in calls]
+
+
+def get_contact_phone_number(call):
+	"""
+	Get the phone number of the other party of `call`, the caller of incoming calls
+	and the receiver of outgoing ones.
+	"""
+	return call.get("from") if call.get("type") == "Incoming" else call.get("to")
+
+
+def load_user_profiles(users):
+	"""
+	Add full name and image of `users` to the request-scoped profile cache with one query.
+	"""
+	profiles = get_user_profiles()
+	users = {user for user in users if user and user not in profiles}
+	if not users:
+		return
+	for user in frappe.get_all(
+		"User", filters={"name": ["in", list(users)]}, fields=["name", "full_name", "user_image"]
+	):
+		profiles[user.name] = (user.full_name, user.user_image)
+	for user in users - profiles.keys():
+		profiles[user] = (None, None)
+
+
+def get_user_profile(user):
+	if not user:
+		return (None, None)
+	if user not in get_user_profiles():
+		load_user_profiles([user])
+	return get_user_profiles()[user]
+
+
+def get_user_profiles():
+	if getattr(frappe.local, "crm_user_profiles", None) is None:
+		frappe.local.crm_user_profiles = {}
+	return frappe.local.crm_user_profiles
+
+
+def parse_call_log(call, contacts=None):
 	call["show_recording"] = False
 	call["_duration"] = seconds_to_duration(call.get("duration"))
+	number = get_contact_phone_number(call)
+	contact = contacts[number] if contacts else get_contact_by_phone_number(number)
 	if call.get("type") == "Incoming":
 		call["activity_type"] = "incoming_call"
-		contact = get_contact_by_phone_number(call.get("from"))
-		receiver = (
-			frappe.db.get_values("User", call.get("receiver"), ["full_name", "user_image"])[0]
-			if call.get("receiver")
-			else [None, None]
-		)
+		receiver = get_user_profile(call.get("receiver"))
 		call["_caller"] = {
 			"label": contact.get("full_name", "Unknown"),
 			"image": contact.get("image"),
@@ -116,12 +163,7 @@ def parse_call_log(call):
 		}
 	elif call.get("type") == "Outgoing":
 		call["activity_type"] = "outgoing_call"
-		contact = get_contact_by_phone_number(call.get("to"))
-		caller = (
-			frappe.db.get_values("User", call.get("caller"), ["full_name", "user_image"])[0]
-			if call.get("caller")
-			else [None, None]
-		)
+		caller = get_user_profile(call.get("caller"))
 		call["_caller"] = {
 			"label": caller[0],
 			"image": caller[1],
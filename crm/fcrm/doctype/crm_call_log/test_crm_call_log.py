@@ -1,9 +1,64 @@
 # Copyright (c) 2023, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
-# import frappe
-from frappe.tests import UnitTestCase
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase, UnitTestCase
+
+from crm.api.activities import get_linked_records
 
 
 class TestCRMCallLog(UnitTestCase):
 	pass
+
+
+class IntegrationTestCRMCallLog(IntegrationTestCase):
+	def add_call(self, lead, number, type="Incoming"):
+		frappe.get_doc(
+			{
+				"doctype": "CRM Call Log",
+				"id": frappe.generate_hash(length=12),
+				"type": type,
+				"status": "Completed",
+				"from": number if type == "Incoming" else "+919000000000",
+				"to": "+919000000000" if type == "Incoming" else number,
+				"reference_doctype": "CRM Lead",
+				"reference_docname": lead,
+			}
+		).insert(ignore_permissions=True)
+
+	def add_contact(self, i):
+		return frappe.get_doc(
+			{
+				"doctype": "Contact",
+				"first_name": f"Caller {i}",
+				"phone_nos": [{"phone": f"+91981230000{i}", "is_primary_mobile_no": 1}],
+			}
+		).insert(ignore_permissions=True)
+
+	def test_call_queries_do_not_grow_with_calls(self):
+		lead = frappe.get_doc(
+			{"doctype": "CRM Lead", "first_name": "Caller", "mobile_no": "+919812300000"}
+		).insert()
+		# one call of each kind of caller: a lead, a contact and an unknown number
+		self.add_call(lead.name, lead.mobile_no)
+		self.add_call(lead.name, self.add_contact(1).mobile_no, "Outgoing")
+		self.add_call(lead.name, "+15550000001")
+		with patch.object(frappe.db, "sql", wraps=frappe.db.sql) as sql:
+			get_linked_records(lead.name)
+		query_count = sql.call_count
+
+		for i in range(2, 7):
+			self.add_call(lead.name, self.add_contact(i).mobile_no, "Outgoing" if i % 2 else "Incoming")
+			self.add_call(lead.name, f"+1555000000{i}")
+
+		with self.assertQueryCount(query_count):
+			calls = get_linked_records(lead.name)["calls"]
+
+		self.assertEqual(len(calls), 13)
+		calls = {call["from"] if call["type"] == "Incoming" else call["to"]: call for call in calls}
+		self.assertEqual(calls[lead.mobile_no]["_caller"]["label"], lead.lead_name)
+		self.assertEqual(calls["+919812300001"]["_receiver"]["label"], "Caller 1")
+		self.assertEqual(calls["+919812300002"]["_caller"]["label"], "Caller 2")
+		self.assertEqual(calls["+15550000002"]["_caller"]["label"], "Unknown")
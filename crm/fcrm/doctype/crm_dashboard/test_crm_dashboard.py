@@ -1,9 +1,29 @@
 # Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
-# import frappe
+import json
+import re
+import time
+from unittest.mock import patch
+
+import frappe
 from frappe.tests import IntegrationTestCase, UnitTestCase
 
+from crm.api.dashboard import (
+	NUMBER_CARDS,
+	clear_dashboard_cache,
+	get_cached_charts_data,
+	get_chart_cache_key,
+	get_charts_data,
+	get_dashboard_cache_version,
+	get_number_card_values,
+	refresh_cached_charts_data,
+)
+from crm.fcrm.doctype.crm_dashboard.crm_dashboard import default_manager_dashboard_layout
+
+# tables dashboard queries must always be able to read through an index
+INDEXED_TABLES = {"tabCRM Lead", "tabCRM Deal", "tabCRM Status Change Log", "tabCRM Dashboard Rollup"}
+
 
 # On IntegrationTestCase, the doctype test records and all
 # link-field test record dependencies are recursively loaded
@@ -27,4 +47,117 @@ class IntegrationTestCRMDashboard(IntegrationTestCase):
 	Use this class for testing interactions between multiple components.
 	"""
 
-	pass
+	def test_number_cards_scan_each_table_once(self):
+		from_date, to_date = frappe.utils.get_first_day(frappe.utils.nowdate()), frappe.utils.nowdate()
+		names = list(NUMBER_CARDS)
+
+		with self.assertQueryCount(len(names)):
+			per_card = {}
+			for name in names:
+				per_card.update(get_number_card_values([name], from_date, to_date))
+
+		with self.assertQueryCount(1):
+			combined = get_number_card_values(names, from_date, to_date)
+
+		self.assertEqual(combined, per_card)
+
+		def get_per_card_values():
+			for name in names:
+				get_number_card_values([name], from_date, to_date)
+
+		# best of a few runs, one combined statement is faster than a round trip per card
+		per_card_time = min(self.get_run_time(get_per_card_values) for _ in range(5))
+		combined_time = min(
+			self.get_run_time(lambda: get_number_card_values(names, from_date, to_date)) for _ in range(5)
+		)
+		self.assertLess(combined_time, per_card_time)
+
+	def get_run_time(self, fn):
+		start = time.perf_counter()
+		fn()
+		return time.perf_counter() - start
+
+	def test_dashboard_queries_do_not_scan_full_tables(self):
+		queries = []
+		sql = frappe.db.sql
+
+		def record_sql(query, values=(), *args, **kwargs):
+			if str(query).lstrip().upper().startswith("SELECT"):
+				queries.append((str(query), values))
+			return sql(query, values, *args, **kwargs)
+
+		names = [chart["name"] for chart in json.loads(default_manager_dashboard_layout())]
+		from_date = frappe.utils.get_first_day(frappe.utils.nowdate())
+		to_date = frappe.utils.get_last_day(frappe.utils.nowdate())
+		with patch.object(frappe.db, "sql", record_sql):
+			get_charts_data(names, from_date, to_date)
+
+		self.assertTrue(queries)
+		for query, values in queries:
+			aliases = {
+				alias or table: table
+				for table, alias in re.findall(
+					r"`(tab[^`]+)`(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|LEFT\b|GROUP\b)(\w+))?", query, re.I
+				)
+			}
+			for row in sql(f"EXPLAIN {query}", values, as_dict=True):
+				if aliases.get(row.table, row.table) not in INDEXED_TABLES:
+					continue
+				# the optimizer picks a full scan of the few rows of a test site whatever the
+				# indexes, so only check that the query can use one once the table grows
+				self.assertTrue(row.possible_keys, f"No usable index on {row.table}: {query}")
+
+
+class IntegrationTestCRMDashboardCache(IntegrationTestCase):
+	def setUp(self):
+		self.from_date = str(frappe.utils.get_first_day(frappe.utils.nowdate()))
+		self.to_date = str(frappe.utils.get_last_day(frappe.utils.nowdate()))
+		for lang in (frappe.local.lang, "de"):
+			frappe.cache.delete_value(self.get_cache_key(lang))
+
+	def get_cache_key(self, lang):
+		return get_chart_cache_key("total_leads", self.from_date, self.to_date, "", "sales_manager", lang)
+
+	def get_total_leads(self):
+		data = get_cached_charts_data(["total_leads"], self.from_date, self.to_date, "", "sales_manager")
+		return data["total_leads"]["value"]
+
+	def get_refresh_job(self):
+		with patch("frappe.enqueue") as enqueue:
+			self.get_total_leads()
+		enqueue.assert_called_once()
+		job = enqueue.call_args.kwargs
+		return {key: job[key] for key in ("names", "from_date", "to_date", "user", "scope", "lang")}
+
+	def test_charts_are_served_from_cache_until_refreshed(self):
+		total = self.get_total_leads()
+		with self.assertQueryCount(0):
+			self.assertEqual(self.get_total_leads(), total)
+
+		# saving a lead clears the cache, the stale chart is served once and refreshed in the background
+		frappe.get_doc({"doctype": "CRM Lead", "first_name": "Dashboard Cache"}).insert()
+		with patch("frappe.enqueue") as enqueue:
+			self.assertEqual(self.get_total_leads(), total)
+		self.assertEqual(enqueue.call_args.kwargs["names"], ["total_leads"])
+
+		refresh_cached_charts_data(**self.get_refresh_job())
+		with patch("frappe.enqueue") as enqueue:
+			self.assertEqual(self.get_total_leads(), total + 1)
+		enqueue.assert_not_called()
+
+	def test_charts_are_refreshed_in_the_language_they_were_read_in(self):
+		lang = frappe.local.lang
+		self.get_total_leads()
+		clear_dashboard_cache()
+		job = self.get_refresh_job()
+		self.assertEqual(job["lang"], lang)
+
+		# the worker starts in another language than the user that read the chart
+		frappe.local.lang = "de"
+		self.addCleanup(setattr, frappe.local, "lang", lang)
+		refresh_cached_charts_data(**job)
+
+		self.assertEqual(
+			frappe.cache.get_value(self.get_cache_key(lang))["version"], get_dashboard_cache_version()
+		)
+		self.assertIsNone(frappe.cache.get_value(self.get_cache_key("de")))
@@ -0,0 +1,157 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import hashlib
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import flt, getdate, now
+
+# doctype: owner field
+ROLLUP_SOURCES = {
+	"CRM Lead": "lead_owner",
+	"CRM Deal": "deal_owner",
+}
+
+ROLLUP_DIMENSIONS = ["date", "reference_doctype", "record_owner", "source", "territory", "status_type"]
+
+
+class CRMDashboardRollup(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("CRM Dashboard Rollup", ["reference_doctype", "date"])
+
+
+def update_dashboard_rollup(doc, method=None):
+	"""
+	Move `doc` from the rollup row it was counted in to the one it belongs to now.
+	Runs on update of CRM Lead and CRM Deal, which includes their insert.
+	"""
+	old = doc.get_doc_before_save()
+	key, value = get_rollup_key(doc), get_rollup_value(doc)
+	old_key, old_value = (get_rollup_key(old), get_rollup_value(old)) if old else (None, 0)
+
+	if key == old_key and value == old_value:
+		return
+	if old_key:
+		add_to_rollup(old_key, -1, -old_value)
+	add_to_rollup(key, 1, value)
+
+
+def remove_from_dashboard_rollup(doc, method=None):
+	add_to_rollup(get_rollup_key(doc), -1, -get_rollup_value(doc))
+
+
+def get_rollup_key(doc) -> tuple:
+	owner_field = ROLLUP_SOURCES[doc.doctype]
+	status_type = None
+	if doc.doctype == "CRM Deal" and doc.status:
+		status_type = frappe.get_cached_value("CRM Deal Status", doc.status, "type")
+	return (
+		getdate(doc.creation or now()),
+		doc.doctype,
+		doc.get(owner_field) or None,
+		doc.source or None,
+		doc.territory or None,
+		status_type,
+	)
+
+
+def get_rollup_value(doc) -> float:
+	if doc.doctype != "CRM Deal":
+		return 0
+	exchange_rate = 1 if doc.exchange_rate is None else flt(doc.exchange_rate)
+	return flt(doc.deal_value) * exchange_rate
+
+
+def get_rollup_name(key: tuple) -> str:
+	return hashlib.md5("|".join(str(v or "") for v in key).encode()).hexdigest()
+
+
+def add_to_rollup(key: tuple, count: int, value: float):
+	values = dict(zip(ROLLUP_DIMENSIONS, key, strict=True))
+	values.update(name=get_rollup_name(key), count=count, value=value, now=now(), user=frappe.session.user)
+	frappe.db.sql(
+		"""
+		INSERT INTO `tabCRM Dashboard Rollup`
+			(name, creation, modified, owner, modified_by,
+			date, reference_doctype, record_owner, source, territory, status_type, count, value)
+		VALUES
+			(%(name)s, %(now)s, %(now)s, %(user)s, %(user)s,
+			%(date)s, %(reference_doctype)s, %(record_owner)s, %(source)s, %(territory)s, %(status_type)s,
+			%(count)s, %(value)s)
+		ON DUPLICATE KEY UPDATE
+			count = count + VALUES(count),
+			value = value + VALUES(value),
+			modified = VALUES(modified)
+		""",
+		values,
+	)
+	if count < 0:
+		# an empty row would still link to its owner, source and territory and block deleting them
+		frappe.db.delete("CRM Dashboard Rollup", {"name": values["name"], "count": ["<=", 0]})
+
+
+def reconcile_dashboard_rollup():
+	"""
+	Rebuild the dashboard rollup from CRM Lead and CRM Deal.
+
+	Runs nightly to correct drift from changes that skip document events, like
+	`db.set_value` or a deal status changing its type, and to drop empty rows.
+
+	Rollup rows are locked before the records are counted, so document events
+	updating the rollup meanwhile wait and apply their change on top of the
+	rebuilt rows instead of being overwritten by a count that missed them.
+	"""
+	if not frappe.flags.in_test:
+		# start a new transaction, so the counts below are read after the lock is held
+		frappe.db.commit()
+	frappe.db.sql("SELECT name FROM `tabCRM Dashboard Rollup` FOR UPDATE")
+
+	rows = []
+	for doctype, owner_field in ROLLUP_SOURCES.items():
+		is_deal = doctype == "CRM Deal"
+		rows += frappe.db.sql(
+			f"""
+			SELECT
+				DATE(d.creation) AS date,
+				%(doctype)s AS reference_doctype,
+				d.{owner_field} AS record_owner,
+				d.source,
+				d.territory,
+				{"s.type" if is_deal else "NULL"} AS status_type,
+				COUNT(*) AS count,
+				{"SUM(COALESCE(d.deal_value, 0) * IFNULL(d.exchange_rate, 1))" if is_deal else "0"} AS value
+			FROM `tab{doctype}` d
+			{"LEFT JOIN `tabCRM Deal Status` s ON s.name = d.status" if is_deal else ""}
+			GROUP BY 1, 3, 4, 5, 6
+			""",
+			{"doctype": doctype},
+			as_dict=True,
+		)
+
+	# empty strings and nulls share a row, the way document events count them
+	totals = {}
+	for row in rows:
+		key = tuple(row[d] or None for d in ROLLUP_DIMENSIONS)
+		count, value = totals.get(key, (0, 0))
+		totals[key] = (count + row.count, value + flt(row.value))
+
+	timestamp, user = now(), frappe.session.user
+	values = [
+		(get_rollup_name(key), timestamp, timestamp, user, user, *key, count, value)
+		for key, (count, value) in totals.items()
+	]
+
+	frappe.db.delete("CRM Dashboard Rollup")
+	frappe.db.bulk_insert(
+		"CRM Dashboard Rollup",
+		["name", "creation", "modified", "owner", "modified_by", *ROLLUP_DIMENSIONS, "count", "value"],
+		values,
+	)
+
+	from crm.api.dashboard import clear_dashboard_cache
+
+	clear_dashboard_cache()
@@ -0,0 +1,42 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup import reconcile_dashboard_rollup
+
+
+def get_rollup():
+	return frappe.get_all(
+		"CRM Dashboard Rollup",
+		fields=["name", "count", "value"],
+		order_by="name",
+	)
+
+
+class IntegrationTestCRMDashboardRollup(IntegrationTestCase):
+	def test_incremental_rollup_matches_reconcile(self):
+		reconcile_dashboard_rollup()
+		lead = frappe.get_doc({"doctype": "CRM Lead", "first_name": "Rollup"}).insert()
+		lead.lead_owner = "Administrator"
+		lead.save()
+		incremental = get_rollup()
+
+		reconcile_dashboard_rollup()
+		self.assertEqual(incremental, get_rollup())
+
+		lead.delete()
+		self.assertNotEqual(incremental, get_rollup())
+
+	def test_empty_rows_are_removed(self):
+		if not frappe.db.exists("CRM Territory", "Rollup Territory"):
+			frappe.get_doc({"doctype": "CRM Territory", "territory_name": "Rollup Territory"}).insert()
+		lead = frappe.get_doc(
+			{"doctype": "CRM Lead", "first_name": "Rollup", "territory": "Rollup Territory"}
+		).insert()
+		self.assertTrue(frappe.db.exists("CRM Dashboard Rollup", {"territory": "Rollup Territory"}))
+
+		lead.delete()
+		self.assertFalse(frappe.db.exists("CRM Dashboard Rollup", {"territory": "Rollup Territory"}))
+		frappe.delete_doc("CRM Territory", "Rollup Territory")
@@ -194,7 +194,7 @@ class CRMDeal(Document):
 		"""
 		if not self.sla:
 			return
-		sla = frappe.get_last_doc("CRM Service Level Agreement", {"name": self.sla})
+		sla = frappe.get_cached_doc("CRM Service Level Agreement", self.sla)
 		if sla:
 			sla.apply(self)
 
@@ -327,6 +327,11 @@ class CRMDeal(Document):
 		}
 
 
+def on_doctype_update():
+	frappe.db.add_index("CRM Deal", ["creation", "deal_owner", "status"])
+	frappe.db.add_index("CRM Deal", ["sla_status", "response_by"])
+
+
 @frappe.whitelist()
 def add_contact(deal, contact):
 	if not frappe.has_permission("CRM Deal", "write", deal):
@@ -23,6 +23,16 @@ class CRMFormScript(Document):
 			else:
 				frappe.throw(_("You need to be in developer mode to edit a Standard Form Script"))
 
+	def on_update(self):
+		from crm.api.doc import clear_view_meta_cache
+
+		clear_view_meta_cache(self.dt)
+
+	def on_trash(self):
+		from crm.api.doc import clear_view_meta_cache
+
+		clear_view_meta_cache(self.dt)
+
 def get_form_script(dt, view="Form"):
 	"""Returns the form script for the given doctype"""
 	FormScript = frappe.qb.DocType("CRM Form Script")
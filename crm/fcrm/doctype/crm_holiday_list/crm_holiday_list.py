@@ -2,12 +2,16 @@
 # For license information, please see license.txt
 
 import json
+from bisect import bisect_left
+from datetime import date
 
 import frappe
 from frappe import _, throw
 from frappe.model.document import Document
 from frappe.utils import cint, formatdate, getdate, today
 
+HOLIDAY_INDEX_CACHE_KEY = "crm_holiday_index"
+
 
 class CRMHolidayList(Document):
 	# begin: auto-generated types
@@ -31,6 +35,12 @@ class CRMHolidayList(Document):
 		self.validate_days()
 		self.total_holidays = len(self.holidays)
 
+	def on_update(self):
+		frappe.cache.hdel(HOLIDAY_INDEX_CACHE_KEY, self.name)
+
+	def on_trash(self):
+		frappe.cache.hdel(HOLIDAY_INDEX_CACHE_KEY, self.name)
+
 	@frappe.whitelist()
 	def get_weekly_off_dates(self):
 		self.validate_values()
@@ -83,3 +93,50 @@ class CRMHolidayList(Document):
 			reference_date += timedelta(days=7)
 
 		return date_list
+
+
+class HolidayIndex:
+	"""
+	Sorted holidays of a holiday list with running per-weekday counts, so that
+	membership is a set lookup and counting holidays in a range is a bisect.
+	"""
+
+	def __init__(self, dates: list[date]):
+		self.dates = sorted(set(dates))
+		self.date_set = set(self.dates)
+		# weekday_counts[i][weekday] is the number of holidays in `dates[:i]` on that weekday
+		self.weekday_counts = [(0,) * 7]
+		for day in self.dates:
+			counts = list(self.weekday_counts[-1])
+			counts[day.weekday()] += 1
+			self.weekday_counts.append(tuple(counts))
+
+	def __contains__(self, day: date) -> bool:
+		return day in self.date_set
+
+	def __len__(self) -> int:
+		return len(self.dates)
+
+	def count_by_weekday(self, from_date: date, to_date: date) -> list[int]:
+		"""
+		Count holidays from `from_date` up to (excluding) `to_date` for every weekday, Monday first
+		"""
+		start = self.weekday_counts[bisect_left(self.dates, from_date)]
+		end = self.weekday_counts[bisect_left(self.dates, to_date)]
+		return [e - s for s, e in zip(start, end, strict=True)]
+
+
+def get_holiday_index(holiday_list: str) -> HolidayIndex:
+	"""
+	Get the cached `HolidayIndex` of `holiday_list`, rebuilt after the list is saved
+	"""
+
+	def build():
+		dates = frappe.get_all(
+			"CRM Holiday",
+			filters={"parenttype": "CRM Holiday List", "parent": holiday_list},
+			pluck="date",
+		)
+		return HolidayIndex([getdate(d) for d in dates])
+
+	return frappe.cache.hget(HOLIDAY_INDEX_CACHE_KEY, holiday_list, build)
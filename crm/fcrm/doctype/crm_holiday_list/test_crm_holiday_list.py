@@ -1,9 +1,20 @@
 # Copyright (c) 2023, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
-# import frappe
+from datetime import date
+
 from frappe.tests import UnitTestCase
 
+from crm.fcrm.doctype.crm_holiday_list.crm_holiday_list import HolidayIndex
+
 
 class TestCRMHolidayList(UnitTestCase):
-	pass
+	def test_holiday_index(self):
+		# 2024-03-25 is a Monday
+		index = HolidayIndex([date(2024, 3, 29), date(2024, 3, 25), date(2024, 4, 1), date(2024, 3, 25)])
+		self.assertEqual(len(index), 3)
+		self.assertIn(date(2024, 3, 29), index)
+		self.assertNotIn(date(2024, 3, 26), index)
+		self.assertEqual(index.count_by_weekday(date(2024, 3, 25), date(2024, 4, 1)), [1, 0, 0, 0, 1, 0, 0])
+		self.assertEqual(index.count_by_weekday(date(2024, 3, 26), date(2024, 4, 2)), [1, 0, 0, 0, 1, 0, 0])
+		self.assertEqual(index.count_by_weekday(date(2024, 1, 1), date(2024, 2, 1)), [0] * 7)
@@ -365,7 +365,7 @@ class CRMLead(Document):
 		"""
 		if not self.sla:
 			return
-		sla = frappe.get_last_doc("CRM Service Level Agreement", {"name": self.sla})
+		sla = frappe.get_cached_doc("CRM Service Level Agreement", self.sla)
 		if sla:
 			sla.apply(self)
 
@@ -451,6 +451,11 @@ class CRMLead(Document):
 		}
 
 
+def on_doctype_update():
+	frappe.db.add_index("CRM Lead", ["creation", "lead_owner", "status"])
+	frappe.db.add_index("CRM Lead", ["sla_status", "response_by"])
+
+
 @frappe.whitelist()
 def convert_to_deal(lead, doc=None, deal=None, existing_contact=None, existing_organization=None):
 	if not (doc and doc.flags.get("ignore_permissions")) and not frappe.has_permission(
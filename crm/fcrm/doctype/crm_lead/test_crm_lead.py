@@ -1,9 +1,132 @@
 # Copyright (c) 2023, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
-# import frappe
-from frappe.tests import UnitTestCase
+import json
+import time
+from unittest.mock import patch
+
+import frappe
+from bs4 import BeautifulSoup
+from frappe.tests import IntegrationTestCase, UnitTestCase
+
+from crm.api.activities import get_activities_page, get_lead_activities, parse_attachment_log
+
+ATTACHMENT_LOGS = [
+	('<a href="/files/proposal.pdf" target="_blank">proposal.pdf</a>', "Attachment"),
+	('<a href="/private/files/q&amp;a.png">q&amp;a.png</a>', "Attachment"),
+	("Removed <a href='/files/old.docx'>old.docx</a>", "Attachment Removed"),
+	('Removed <A HREF="/files/Report.PDF">Report.PDF</A>', "Attachment Removed"),
+	("Removed old.docx", "Attachment Removed"),
+]
+
+
+def parse_attachment_log_with_soup(html, type):
+	"""Reference implementation: the BeautifulSoup parse `parse_attachment_log` used to do."""
+	a_tag = BeautifulSoup(html, "html.parser").find("a")
+	type = "added" if type == "Attachment" else "removed"
+	if not a_tag:
+		return {"type": type, "file_name": html.replace("Removed ", ""), "file_url": "", "is_private": False}
+	return {
+		"type": type,
+		"file_name": a_tag.text,
+		"file_url": a_tag["href"],
+		"is_private": "private/files" in a_tag["href"],
+	}
 
 
 class TestCRMLead(UnitTestCase):
-	pass
+	def test_parse_attachment_log_matches_soup(self):
+		for html, type in ATTACHMENT_LOGS:
+			self.assertEqual(parse_attachment_log(html, type), parse_attachment_log_with_soup(html, type))
+
+	def test_parse_attachment_log_is_faster_than_soup(self):
+		timings = []
+		for parse in (parse_attachment_log_with_soup, parse_attachment_log):
+			began = time.perf_counter()
+			for _ in range(500):
+				for html, type in ATTACHMENT_LOGS:
+					parse(html, type)
+			timings.append(time.perf_counter() - began)
+
+		soup_time, parse_time = timings
+		self.assertLess(parse_time * 5, soup_time)
+
+
+class IntegrationTestCRMLead(IntegrationTestCase):
+	def test_activity_queries_do_not_grow_with_comments(self):
+		lead = frappe.get_doc({"doctype": "CRM Lead", "first_name": "Timeline"}).insert()
+		get_lead_activities(lead.name)
+
+		query_counts = []
+		for _ in range(2):
+			for _ in range(5):
+				frappe.get_doc(
+					{
+						"doctype": "Comment",
+						"comment_type": "Comment",
+						"reference_doctype": "CRM Lead",
+						"reference_name": lead.name,
+						"content": "Timeline comment",
+					}
+				).insert(ignore_permissions=True)
+
+			with patch.object(frappe.db, "sql", wraps=frappe.db.sql) as sql:
+				get_lead_activities(lead.name)
+			query_counts.append(sql.call_count)
+
+		self.assertEqual(query_counts[0], query_counts[1])
+
+	def add_comment(self, lead):
+		frappe.get_doc(
+			{
+				"doctype": "Comment",
+				"comment_type": "Comment",
+				"reference_doctype": "CRM Lead",
+				"reference_name": lead,
+				"content": "Timeline comment",
+			}
+		).insert(ignore_permissions=True)
+
+	def add_change(self, lead, value):
+		frappe.get_doc(
+			{
+				"doctype": "CRM Activity Log",
+				"reference_doctype": "CRM Lead",
+				"reference_docname": lead,
+				"activity_type": "changed",
+				"field": "first_name",
+				"old_value": json.dumps("Timeline"),
+				"value": json.dumps(value),
+			}
+		).insert(ignore_permissions=True)
+
+	def test_activity_pages_walk_the_whole_timeline(self):
+		lead = frappe.get_doc({"doctype": "CRM Lead", "first_name": "Timeline"}).insert()
+		for _ in range(5):
+			self.add_comment(lead.name)
+
+		activities, cursor = [], None
+		while True:
+			page = get_activities_page(lead.name, limit=2, cursor=cursor)
+			activities += page["activities"]
+			if not (cursor := page["next_cursor"]):
+				break
+
+		self.assertEqual([a["activity_type"] for a in activities], ["comment"] * 5 + ["creation"])
+		self.assertEqual(len({a["name"] for a in activities if a.get("name")}), 5)
+
+	def test_version_group_is_kept_on_one_page(self):
+		lead = frappe.get_doc({"doctype": "CRM Lead", "first_name": "Timeline"}).insert()
+		for i in range(3):
+			self.add_change(lead.name, f"Timeline {i}")
+		self.add_comment(lead.name)
+
+		page = get_activities_page(lead.name, limit=2)
+		self.assertEqual([a["activity_type"] for a in page["activities"]], ["comment", "changed"])
+		self.assertEqual(len(page["activities"][1]["other_versions"]), 2)
+		self.assertIn("calls", page)
+
+		page = get_activities_page(lead.name, limit=2, cursor=page["next_cursor"])
+		self.assertEqual([a["activity_type"] for a in page["activities"]], ["creation"])
+		self.assertIsNone(page["next_cursor"])
+		self.assertNotIn("calls", page)
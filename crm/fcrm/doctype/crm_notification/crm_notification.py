@@ -4,34 +4,152 @@
 import frappe
 from frappe import _
 from frappe.model.document import Document
+from frappe.utils import now
+
+from crm.api.notifications import clear_unread_notifications_count
+
+NOTIFICATION_FIELDS = (
+	"from_user",
+	"to_user",
+	"type",
+	"message",
+	"notification_text",
+	"notification_type_doctype",
+	"notification_type_doc",
+	"reference_doctype",
+	"reference_name",
+)
 
 
 class CRMNotification(Document):
 	def on_update(self):
 		if self.to_user:
-			frappe.publish_realtime("crm_notification", user= self.to_user)
+			clear_unread_notifications_count(self.to_user)
+			frappe.publish_realtime("crm_notification", user=self.to_user)
+
+	def on_trash(self):
+		if self.to_user:
+			clear_unread_notifications_count(self.to_user)
+
+
+def on_doctype_update():
+	frappe.db.add_index("CRM Notification", ["to_user", "creation"])
+	frappe.db.add_index("CRM Notification", ["to_user", "read"])
+
 
 def notify_user(args):
 	"""
-	Notify the assigned user
+	Notify the assigned user.
+
+	The notification is added to an outbox which is flushed into one
+	background job once the transaction commits, and dropped on rollback.
 	"""
 	args = frappe._dict(args)
 	if args.owner == args.assigned_to:
 		return
 
-	values = frappe._dict(
-		doctype="CRM Notification",
-		from_user=args.owner,
-		to_user=args.assigned_to,
-		type=args.notification_type,
-		message=args.message,
-		notification_text=args.notification_text,
-		notification_type_doctype=args.reference_doctype,
-		notification_type_doc=args.reference_docname,
-		reference_doctype=args.redirect_to_doctype,
-		reference_name=args.redirect_to_docname,
+	outbox = getattr(frappe.local, "crm_notification_outbox", None)
+	if outbox is None:
+		outbox = frappe.local.crm_notification_outbox = []
+		frappe.db.after_commit.add(flush_notification_outbox)
+		frappe.db.after_rollback.add(clear_notification_outbox)
+
+	outbox.append(
+		{
+			"from_user": args.owner,
+			"to_user": args.assigned_to,
+			"type": args.notification_type,
+			"message": args.message,
+			"notification_text": args.notification_text,
+			"notification_type_doctype": args.reference_doctype,
+			"notification_type_doc": args.reference_docname,
+			"reference_doctype": args.redirect_to_doctype,
+			"reference_name": args.redirect_to_docname,
+			"creation": now(),
+		}
 	)
 
-	if frappe.db.exists("CRM Notification", values):
+
+def flush_notification_outbox():
+	notifications = getattr(frappe.local, "crm_notification_outbox", None)
+	frappe.local.crm_notification_outbox = None
+	if notifications:
+		frappe.enqueue(
+			"crm.fcrm.doctype.crm_notification.crm_notification.insert_notifications",
+			queue="short",
+			notifications=notifications,
+		)
+
+
+def clear_notification_outbox():
+	frappe.local.crm_notification_outbox = None
+
+
+def insert_notifications(notifications):
+	"""
+	Insert `notifications` with one query, skipping those that already exist,
+	and let each recipient know once.
+	"""
+	notifications = {tuple(n.get(field) for field in NOTIFICATION_FIELDS): n for n in notifications}
+	if not notifications:
 		return
-	frappe.get_doc(values).insert(ignore_permissions=True)
+
+	for row in get_existing_notifications(notifications.values()):
+		notifications.pop(tuple(row.get(field) for field in NOTIFICATION_FIELDS), None)
+	if not notifications:
+		return
+
+	fields = ["name", "owner", "modified_by", "creation", "modified", "read", *NOTIFICATION_FIELDS]
+	user = frappe.session.user
+	frappe.db.bulk_insert(
+		"CRM Notification",
+		fields,
+		[
+			(
+				frappe.generate_hash(length=10),
+				user,
+				user,
+				n["creation"],
+				n["creation"],
+				0,
+				*(n.get(field) for field in NOTIFICATION_FIELDS),
+			)
+			for n in notifications.values()
+		],
+	)
+
+	for to_user in {n["to_user"] for n in notifications.values()}:
+		clear_unread_notifications_count(to_user)
+		frappe.publish_realtime("crm_notification", user=to_user, after_commit=True)
+
+
+def get_existing_notifications(notifications):
+	"""
+	Get the stored notifications that could be duplicates of `notifications`.
+	Notifications about a document are looked up by their documents, the others
+	by their types, so neither lookup reads every notification of the recipients.
+	"""
+	with_doc = [n for n in notifications if n.get("notification_type_doc")]
+	without_doc = [n for n in notifications if not n.get("notification_type_doc")]
+
+	existing = []
+	if with_doc:
+		existing += frappe.get_all(
+			"CRM Notification",
+			filters={
+				"to_user": ["in", list({n["to_user"] for n in with_doc})],
+				"notification_type_doc": ["in", list({n["notification_type_doc"] for n in with_doc})],
+			},
+			fields=list(NOTIFICATION_FIELDS),
+		)
+	if without_doc:
+		existing += frappe.get_all(
+			"CRM Notification",
+			filters={
+				"to_user": ["in", list({n["to_user"] for n in without_doc})],
+				"type": ["in", list({n.get("type") for n in without_doc})],
+				"notification_type_doc": ["is", "not set"],
+			},
+			fields=list(NOTIFICATION_FIELDS),
+		)
+	return existing
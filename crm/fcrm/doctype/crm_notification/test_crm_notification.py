@@ -1,9 +1,163 @@
 # Copyright (c) 2024, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
-# import frappe
-from frappe.tests import UnitTestCase
+import time
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase, UnitTestCase
+
+from crm.api.notifications import get_notifications, get_unread_notifications_count, mark_as_read
+from crm.fcrm.doctype.crm_notification.crm_notification import (
+	NOTIFICATION_FIELDS,
+	clear_notification_outbox,
+	insert_notifications,
+	notify_user,
+)
 
 
 class TestCRMNotification(UnitTestCase):
 	pass
+
+
+class IntegrationTestCRMNotification(IntegrationTestCase):
+	def test_notifications_are_paginated_and_counted(self):
+		frappe.db.delete("CRM Notification", {"to_user": "Administrator"})
+		for i in range(5):
+			frappe.get_doc(
+				{
+					"doctype": "CRM Notification",
+					"from_user": "Guest",
+					"to_user": "Administrator",
+					"type": "Mention",
+					"notification_text": f"Notification {i}",
+				}
+			).insert(ignore_permissions=True)
+
+		frappe.set_user("Administrator")
+		seen, cursor = [], None
+		while True:
+			page = get_notifications(limit=2, cursor=cursor)
+			seen += [n["notification_text"] for n in page["notifications"]]
+			if not (cursor := page["next_cursor"]):
+				break
+		self.assertEqual(seen, [f"Notification {i}" for i in reversed(range(5))])
+
+		self.assertEqual(get_unread_notifications_count(), 5)
+		with self.assertQueryCount(0):
+			self.assertEqual(get_unread_notifications_count(), 5)
+
+		notification = frappe.get_last_doc("CRM Notification", {"to_user": "Administrator"})
+		notification.read = 1
+		notification.save()
+		self.assertEqual(get_unread_notifications_count(), 4)
+
+	def test_mark_as_read_is_one_update(self):
+		def add_unread_notifications(count):
+			frappe.db.delete("CRM Notification", {"to_user": "Administrator"})
+			fields = ["name", "from_user", "to_user", "type", "notification_type_doc", "read"]
+			rows = [
+				(frappe.generate_hash(), "Guest", "Administrator", "Mention", f"doc-{i % 2}", 0)
+				for i in range(count)
+			]
+			frappe.db.bulk_insert("CRM Notification", fields, rows)
+
+		def unread(**filters):
+			return frappe.db.count("CRM Notification", {"to_user": "Administrator", "read": 0, **filters})
+
+		add_unread_notifications(10)
+		with self.assertQueryCount(1):
+			mark_as_read("Administrator", "doc-0")
+		self.assertEqual(unread(notification_type_doc="doc-0"), 0)
+		self.assertEqual(unread(notification_type_doc="doc-1"), 5)
+
+		count = 1_000
+		add_unread_notifications(count)
+		start = time.perf_counter()
+		for name in frappe.get_all("CRM Notification", {"to_user": "Administrator", "read": 0}, pluck="name"):
+			notification = frappe.get_doc("CRM Notification", name)
+			notification.read = 1
+			notification.save()
+		loop = time.perf_counter() - start
+
+		add_unread_notifications(count)
+		start = time.perf_counter()
+		mark_as_read("Administrator")
+		bulk = time.perf_counter() - start
+
+		self.assertEqual(unread(), 0)
+		self.assertLess(bulk, loop)
+
+	def test_only_system_manager_marks_notifications_of_others(self):
+		user = "crm-notification-test@example.com"
+		if not frappe.db.exists("User", user):
+			frappe.get_doc({"doctype": "User", "email": user, "first_name": "Notification Test"}).insert()
+		frappe.get_doc(
+			{
+				"doctype": "CRM Notification",
+				"from_user": "Guest",
+				"to_user": "Administrator",
+				"type": "Mention",
+			}
+		).insert(ignore_permissions=True)
+
+		frappe.set_user(user)
+		self.addCleanup(frappe.set_user, "Administrator")
+		with self.assertRaises(frappe.PermissionError):
+			mark_as_read("Administrator")
+		mark_as_read()
+		self.assertTrue(frappe.db.exists("CRM Notification", {"to_user": "Administrator", "read": 0}))
+
+		frappe.set_user("Administrator")
+		mark_as_read(user)
+
+	def test_notifications_are_queued_and_inserted_once(self):
+		frappe.db.delete("CRM Notification", {"to_user": "Administrator"})
+		args = {
+			"owner": "Guest",
+			"assigned_to": "Administrator",
+			"notification_type": "Mention",
+			"message": "Hello",
+			"reference_doctype": "Comment",
+			"reference_docname": "comment-1",
+		}
+		for _ in range(3):
+			notify_user(args)
+		outbox = frappe.local.crm_notification_outbox
+		clear_notification_outbox()
+		self.assertEqual(frappe.db.count("CRM Notification", {"to_user": "Administrator"}), 0)
+
+		with self.assertQueryCount(2):
+			insert_notifications(outbox)
+		insert_notifications(outbox)
+		self.assertEqual(frappe.db.count("CRM Notification", {"to_user": "Administrator"}), 1)
+
+	def test_notifications_without_a_doc_are_not_compared_with_every_notification(self):
+		frappe.db.delete("CRM Notification", {"to_user": "Administrator"})
+		for i in range(5):
+			frappe.get_doc(
+				{
+					"doctype": "CRM Notification",
+					"from_user": "Guest",
+					"to_user": "Administrator",
+					"type": "Mention",
+					"notification_type_doc": f"other-{i}",
+				}
+			).insert(ignore_permissions=True)
+
+		notification = {field: None for field in NOTIFICATION_FIELDS}
+		notification.update(
+			{"from_user": "Guest", "to_user": "Administrator", "creation": frappe.utils.now()}
+		)
+		outbox = [
+			{**notification, "type": "Assignment"},
+			{**notification, "type": "Mention", "notification_type_doc": "comment-1"},
+		]
+		with patch.object(frappe, "get_all", wraps=frappe.get_all) as get_all:
+			insert_notifications(outbox)
+		self.assertEqual(get_all.call_count, 2)
+		for call in get_all.call_args_list:
+			self.assertIn("notification_type_doc", call.kwargs["filters"])
+
+		insert_notifications(outbox)
+		self.assertEqual(frappe.db.count("CRM Notification", {"to_user": "Administrator"}), 7)
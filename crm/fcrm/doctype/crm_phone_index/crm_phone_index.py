@@ -0,0 +1,149 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+from crm.utils import get_canonical_phone_number
+
+PHONE_INDEX_FIELDS = [
+	"name",
+	"creation",
+	"modified",
+	"owner",
+	"modified_by",
+	"phone",
+	"reference_doctype",
+	"reference_name",
+]
+
+
+class CRMPhoneIndex(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("CRM Phone Index", ["reference_name", "reference_doctype"])
+
+
+def get_phone_index_references(phone_number) -> list[tuple[str, str]]:
+	"""
+	Get `(doctype, name)` of the contacts and leads with `phone_number`.
+	"""
+	return get_phone_index_references_by_number([phone_number])[phone_number]
+
+
+def get_phone_index_references_by_number(phone_numbers) -> dict[str, list[tuple[str, str]]]:
+	"""
+	Get `(doctype, name)` of the contacts and leads of each of `phone_numbers`,
+	read in the default region of the site like the indexed numbers are. All
+	numbers are looked up together, in at most two queries.
+
+	Numbers that are not found are looked up again by their digits, the way
+	numbers that could not be parsed are indexed, and as an international
+	number for caller IDs that have a country code but no leading `+`.
+	"""
+	region = get_default_phone_region()
+	references = get_phone_references(
+		{number: [get_canonical_phone_number(number, region)] for number in phone_numbers}
+	)
+
+	fallback = {}
+	for number in phone_numbers:
+		if not references[number] and (digits := "".join(c for c in number or "" if c.isdigit())):
+			fallback[number] = [digits, f"+{digits}"]
+	if fallback:
+		references.update(get_phone_references(fallback))
+	return references
+
+
+def get_phone_references(phones_by_number):
+	phones = list({phone for phones in phones_by_number.values() for phone in phones if phone})
+	rows = []
+	if phones:
+		rows = frappe.get_all(
+			"CRM Phone Index",
+			filters={"phone": ["in", phones]},
+			fields=["phone", "reference_doctype", "reference_name"],
+			as_list=True,
+		)
+
+	references = {}
+	for phone, doctype, name in rows:
+		references.setdefault(phone, []).append((doctype, name))
+	return {
+		number: list(dict.fromkeys(ref for phone in phones for ref in references.get(phone, [])))
+		for number, phones in phones_by_number.items()
+	}
+
+
+def update_phone_index(doc, method=None):
+	"""
+	Re-index the phone numbers of a Contact (including its Contact Phone rows)
+	or the mobile number of a CRM Lead.
+	"""
+	if doc.doctype == "Contact":
+		numbers = [doc.mobile_no] + [row.phone for row in doc.phone_nos]
+	elif doc.has_value_changed("mobile_no"):
+		numbers = [doc.mobile_no]
+	else:
+		return
+
+	remove_from_phone_index(doc)
+	add_to_phone_index([(doc.doctype, doc.name, number) for number in numbers])
+
+
+def remove_from_phone_index(doc, method=None):
+	frappe.db.delete("CRM Phone Index", {"reference_doctype": doc.doctype, "reference_name": doc.name})
+
+
+def add_to_phone_index(numbers):
+	"""
+	Index `(doctype, name, phone_number)` tuples, once per canonical number.
+	Numbers without a country code are read in the default region of the site.
+	"""
+	region = get_default_phone_region()
+	timestamp, user = frappe.utils.now(), frappe.session.user
+	rows = {}
+	for doctype, name, number in numbers:
+		if phone := get_canonical_phone_number(number, region):
+			rows[(phone, doctype, name)] = (
+				frappe.generate_hash(),
+				timestamp,
+				timestamp,
+				user,
+				user,
+				phone,
+				doctype,
+				name,
+			)
+	if rows:
+		frappe.db.bulk_insert("CRM Phone Index", PHONE_INDEX_FIELDS, list(rows.values()))
+
+
+def get_default_phone_region():
+	country = frappe.get_system_settings("country")
+	code = country and frappe.get_cached_value("Country", country, "code")
+	return code.upper() if code else "IN"
+
+
+def rebuild_phone_index():
+	frappe.db.delete("CRM Phone Index")
+
+	contact_numbers = frappe.get_all(
+		"Contact", filters={"mobile_no": ["is", "set"]}, fields=["name", "mobile_no"], as_list=True
+	)
+	contact_numbers += frappe.get_all(
+		"Contact Phone",
+		filters={"parenttype": "Contact", "phone": ["is", "set"]},
+		fields=["parent", "phone"],
+		as_list=True,
+	)
+	lead_numbers = frappe.get_all(
+		"CRM Lead", filters={"mobile_no": ["is", "set"]}, fields=["name", "mobile_no"], as_list=True
+	)
+
+	add_to_phone_index(
+		[("Contact", name, number) for name, number in contact_numbers]
+		+ [("CRM Lead", name, number) for name, number in lead_numbers]
+	)
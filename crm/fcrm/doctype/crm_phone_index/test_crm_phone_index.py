@@ -0,0 +1,78 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase, UnitTestCase
+
+from crm.fcrm.doctype.crm_phone_index.crm_phone_index import get_default_phone_region
+from crm.integrations.api import get_contact_by_phone_number
+from crm.utils import canonicalize_phone_number, get_canonical_phone_number
+
+
+def set_default_country(country):
+	frappe.db.set_single_value("System Settings", "country", country)
+	# settings are kept for the request once read
+	frappe.local.system_settings = None
+
+
+class TestPhoneNumbers(UnitTestCase):
+	def test_invalid_numbers(self):
+		for number in ("", "not a number"):
+			self.assertEqual(canonicalize_phone_number(number), (None, False))
+			self.assertEqual(get_canonical_phone_number(number), "")
+		# parseable but invalid numbers are kept, they are just not valid
+		self.assertEqual(canonicalize_phone_number("12345"), ("+9112345", False))
+
+	def test_numbers_without_country_code_are_read_in_the_default_region(self):
+		self.assertEqual(get_canonical_phone_number("650 253 0000", "US"), "+16502530000")
+		self.assertEqual(get_canonical_phone_number("98765 43210"), "+919876543210")
+		self.assertEqual(get_canonical_phone_number("98765 43210", "US"), "+19876543210")
+		self.assertEqual(get_canonical_phone_number(""), "")
+
+	def test_parsed_numbers_are_cached_per_region(self):
+		canonicalize_phone_number.cache_clear()
+		for _ in range(3):
+			canonicalize_phone_number("+91 98765 43210", "IN")
+		canonicalize_phone_number("+91 98765 43210", "US")
+		info = canonicalize_phone_number.cache_info()
+		self.assertEqual((info.misses, info.hits), (2, 2))
+
+
+class IntegrationTestCRMPhoneIndex(IntegrationTestCase):
+	def test_caller_is_found_in_any_format(self):
+		lead = frappe.get_doc(
+			{"doctype": "CRM Lead", "first_name": "Caller", "mobile_no": "+91 98765-43210"}
+		).insert()
+
+		for number in ("+919876543210", "+91 (987) 654 3210"):
+			self.assertEqual(get_contact_by_phone_number(number).get("lead"), lead.name)
+
+		lead.mobile_no = "+91 91234 56789"
+		lead.save()
+		self.assertIsNone(get_contact_by_phone_number("+919876543210").get("lead"))
+		self.assertEqual(get_contact_by_phone_number("+919123456789").get("lead"), lead.name)
+
+	def test_numbers_are_read_in_the_default_region_on_both_sides(self):
+		set_default_country("India")
+		lead = frappe.get_doc(
+			{"doctype": "CRM Lead", "first_name": "Caller", "mobile_no": "98765 43210"}
+		).insert()
+
+		for number in ("+919876543210", "098765 43210", "9876543210"):
+			self.assertEqual(get_contact_by_phone_number(number).get("lead"), lead.name)
+
+	def test_caller_id_without_plus_is_found_by_its_digits(self):
+		set_default_country("India")
+		lead = frappe.get_doc(
+			{"doctype": "CRM Lead", "first_name": "Caller", "mobile_no": "+1 415 555 0100"}
+		).insert()
+
+		# read in the default region this is an Indian number, it is found by its digits
+		self.assertEqual(get_contact_by_phone_number("14155550100").get("lead"), lead.name)
+		self.assertIsNone(get_contact_by_phone_number("14155550101").get("lead"))
+
+	def test_default_region_is_read_from_cached_settings(self):
+		set_default_country("India")
+		self.assertEqual(get_default_phone_region(), "IN")
+		with self.assertQueryCount(0):
+			self.assertEqual(get_default_phone_region(), "IN")
@@ -1,7 +1,8 @@
 # Copyright (c) 2023, Frappe Technologies Pvt. Ltd. and contributors
 # For license information, please see license.txt
 
-from datetime import timedelta
+from datetime import datetime, time, timedelta
+from math import ceil
 
 import frappe
 from frappe import _
@@ -13,9 +14,11 @@ from frappe.utils import (
 	getdate,
 	now_datetime,
 	time_diff_in_seconds,
+	to_timedelta,
 )
 
-from crm.fcrm.doctype.crm_service_level_agreement.utils import get_context
+from crm.fcrm.doctype.crm_holiday_list.crm_holiday_list import HolidayIndex, get_holiday_index
+from crm.fcrm.doctype.crm_service_level_agreement.utils import clear_sla_registry, get_context
 
 
 class CRMServiceLevelAgreement(Document):
@@ -47,6 +50,12 @@ class CRMServiceLevelAgreement(Document):
 		self.validate_default()
 		self.validate_condition()
 
+	def on_update(self):
+		clear_sla_registry()
+
+	def on_trash(self):
+		clear_sla_registry()
+
 	def validate_default(self):
 		if self.default:
 			other_slas = frappe.get_all(
@@ -198,36 +207,26 @@ class CRMServiceLevelAgreement(Document):
 		start_at: str,
 		duration_seconds: int,
 	):
+		"""
+		Get the datetime at which `duration_seconds` of working time have
+		passed since `start_at`
+
+		:param start_at: Date at which calculation starts
+		:param duration_seconds: Working seconds to add
+		:return: Target datetime, `None` if the SLA has no working hours
+		"""
 		res = get_datetime(start_at)
 		time_needed = duration_seconds
-		holidays = self.get_holidays()
-		weekdays = get_weekdays()
-		workdays = self.get_workdays()
-		while time_needed:
-			today = res
-			today_day = getdate(today)
-			today_weekday = weekdays[today.weekday()]
-			is_workday = today_weekday in workdays
-			is_holiday = today_day in holidays
-			if is_holiday or not is_workday:
-				res = add_to_date(res, days=1, as_datetime=True)
-				continue
-			today_workday = workdays[today_weekday]
-			now_in_seconds = time_diff_in_seconds(today, today_day)
-			start_time = max(today_workday.start_time.total_seconds(), now_in_seconds)
-			till_start_time = max(start_time - now_in_seconds, 0)
-			end_time = max(today_workday.end_time.total_seconds(), now_in_seconds)
-			time_left = max(end_time - start_time, 0)
-			if not time_left:
-				res = getdate(add_to_date(res, days=1, as_datetime=True))
-				continue
-			time_taken = min(time_needed, time_left)
-			time_needed -= time_taken
-			time_required = till_start_time + time_taken
-			res = add_to_date(res, seconds=time_required, as_datetime=True)
-		return res
-
-	def calc_elapsed_time(self, start_time, end_time) -> float:
+		if not time_needed:
+			return res
+		for window_start, window_end in self.get_working_windows(res):
+			time_left = time_diff_in_seconds(window_end, window_start)
+			if time_needed <= time_left:
+				return add_to_date(window_start, seconds=time_needed, as_datetime=True)
+			time_needed -= time_left
+		return None
+
+	def calc_elapsed_time(self, start_time, end_time) -> int:
 		"""
 		Get took from start to end, excluding non-working hours
 
@@ -237,28 +236,81 @@ class CRMServiceLevelAgreement(Document):
 		"""
 		start_time = get_datetime(start_time)
 		end_time = get_datetime(end_time)
-		holiday_list = []
-		working_day_list = self.get_working_days()
-		working_hours = self.get_working_hours()
 
-		total_seconds = 0
-		current_time = start_time
-
-		while current_time < end_time:
-			in_holiday_list = current_time.date() in holiday_list
-			not_in_working_day_list = get_weekdays()[current_time.weekday()] not in working_day_list
-			if (
-				in_holiday_list
-				or not_in_working_day_list
-				or not self.is_working_time(current_time, working_hours)
-			):
-				current_time += timedelta(seconds=1)
-				continue
-			total_seconds += 1
-			current_time += timedelta(seconds=1)
+		# elapsed time is counted in whole seconds from `start_time`, so shift both
+		# ends onto that grid and round every partial window up to the next second
+		offset = timedelta(microseconds=start_time.microsecond)
+		start_time -= offset
+		end_time -= offset
+
+		if start_time.date() == end_time.date():
+			return self.calc_window_seconds(start_time, end_time)
+
+		# partial first and last day, whole days in between are counted per weekday
+		first_day = start_time.date() + timedelta(days=1)
+		last_day = end_time.date()
+		total_seconds = self.calc_window_seconds(start_time, datetime.combine(first_day, time.min))
+		total_seconds += self.calc_window_seconds(datetime.combine(last_day, time.min), end_time)
+		if first_day < last_day:
+			seconds_per_weekday = self.get_working_seconds_per_weekday()
+			days = self.count_days_by_weekday(first_day, last_day)
+			holidays = self.get_holidays().count_by_weekday(first_day, last_day)
+			for weekday in range(7):
+				total_seconds += (days[weekday] - holidays[weekday]) * seconds_per_weekday[weekday]
+		return total_seconds
 
+	def calc_window_seconds(self, start_time: datetime, end_time: datetime) -> int:
+		total_seconds = 0
+		for window_start, window_end in self.get_working_windows(start_time, end_time):
+			total_seconds += ceil(time_diff_in_seconds(window_end, window_start))
 		return total_seconds
 
+	def get_working_seconds_per_weekday(self) -> list[int]:
+		"""
+		Return working seconds of a whole day for every weekday, Monday first
+		"""
+		working_hours = self.get_working_hours()
+		res = []
+		for weekday in get_weekdays():
+			start_time, end_time = working_hours.get(weekday, (timedelta(0), timedelta(0)))
+			res.append(max(ceil((end_time - start_time).total_seconds()), 0))
+		return res
+
+	@staticmethod
+	def count_days_by_weekday(from_date, to_date) -> list[int]:
+		"""
+		Count days from `from_date` up to (excluding) `to_date` for every weekday, Monday first
+		"""
+		weeks, remainder = divmod((to_date - from_date).days, 7)
+		return [weeks + ((weekday - from_date.weekday()) % 7 < remainder) for weekday in range(7)]
+
+	def get_working_windows(self, start_at: datetime, end_at: datetime | None = None):
+		"""
+		Yield working intervals as `(start, end)` tuples, one per working day,
+		clipped to `start_at` and `end_at`. Unbounded if `end_at` is not set.
+
+		:param start_at: Datetime to start from
+		:param end_at: Datetime to stop at
+		"""
+		working_hours = {day: hours for day, hours in self.get_working_hours().items() if hours[0] < hours[1]}
+		if not working_hours:
+			return
+		holidays = self.get_holidays()
+		weekdays = get_weekdays()
+
+		day = start_at.date()
+		while not end_at or day <= end_at.date():
+			hours = working_hours.get(weekdays[day.weekday()])
+			if hours and day not in holidays:
+				day_start = datetime.combine(day, time.min)
+				window_start = max(day_start + hours[0], start_at)
+				window_end = day_start + hours[1]
+				if end_at:
+					window_end = min(window_end, end_at)
+				if window_start < window_end:
+					yield window_start, window_end
+			day += timedelta(days=1)
+
 	def get_priorities(self):
 		"""
 		Return priorities related info as a dict. With `priority` as key
@@ -278,38 +330,16 @@ class CRMServiceLevelAgreement(Document):
 
 		return self.priorities[0].priority
 
-	def get_workdays(self) -> dict[str, dict]:
+	def get_working_hours(self) -> dict[str, tuple[timedelta, timedelta]]:
 		"""
-		Return workdays related info as a dict. With `workday` as key
+		Return `(start_time, end_time)` of every workday as a dict. With `workday` as key
 		"""
 		res = {}
 		for row in self.working_hours:
-			res[row.workday] = row
+			res[row.workday] = (to_timedelta(row.start_time), to_timedelta(row.end_time))
 		return res
 
-	def get_working_days(self) -> dict[str, dict]:
-		workdays = []
-		for row in self.working_hours:
-			workdays.append(row.workday)
-		return workdays
-
-	def get_working_hours(self) -> dict[str, dict]:
-		res = {}
-		for row in self.working_hours:
-			res[row.workday] = (row.start_time, row.end_time)
-		return res
-
-	def is_working_time(self, date_time, working_hours):
-		day_of_week = get_weekdays()[date_time.weekday()]
-		start_time, end_time = working_hours.get(day_of_week, (0, 0))
-		date_time = timedelta(hours=date_time.hour, minutes=date_time.minute, seconds=date_time.second)
-		return start_time <= date_time < end_time
-
-	def get_holidays(self):
-		res = []
+	def get_holidays(self) -> HolidayIndex:
 		if not self.holiday_list:
-			return res
-		holiday_list = frappe.get_doc("CRM Holiday List", self.holiday_list)
-		for row in holiday_list.holidays:
-			res.append(row.date)
-		return res
+			return HolidayIndex([])
+		return get_holiday_index(self.holiday_list)
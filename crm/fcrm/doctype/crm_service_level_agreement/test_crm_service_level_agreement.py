@@ -1,9 +1,190 @@
 # Copyright (c) 2023, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
-# import frappe
-from frappe.tests import UnitTestCase
+import time
+from datetime import date, datetime, timedelta
+
+import frappe
+from frappe.tests import IntegrationTestCase, UnitTestCase
+from frappe.utils import get_weekdays
+
+from crm.fcrm.doctype.crm_holiday_list.crm_holiday_list import HolidayIndex
+from crm.fcrm.doctype.crm_service_level_agreement.utils import (
+	clear_sla_registry,
+	compile_condition,
+	get_sla,
+	get_sla_registry,
+	update_overdue_sla_status,
+)
+
+
+def make_sla():
+	return frappe.get_doc(
+		{
+			"doctype": "CRM Service Level Agreement",
+			"sla_name": "Test SLA",
+			"apply_on": "CRM Lead",
+			"working_hours": [
+				{"workday": day, "start_time": "09:30:00", "end_time": "17:00:00"}
+				for day in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+			],
+		}
+	)
+
+
+def calc_elapsed_time_per_second(sla, start_time, end_time):
+	"""Reference implementation: the per-second walk `calc_elapsed_time` used to do."""
+	working_hours = sla.get_working_hours()
+	total_seconds = 0
+	current_time = start_time
+	while current_time < end_time:
+		start, end = working_hours.get(get_weekdays()[current_time.weekday()], (0, 0))
+		now = timedelta(hours=current_time.hour, minutes=current_time.minute, seconds=current_time.second)
+		if start and start <= now < end:
+			total_seconds += 1
+		current_time += timedelta(seconds=1)
+	return total_seconds
 
 
 class TestCRMServiceLevelAgreement(UnitTestCase):
-	pass
+	def test_elapsed_time_matches_per_second_walk(self):
+		sla = make_sla()
+		cases = [
+			# same day, inside working hours
+			(datetime(2024, 3, 4, 10, 0), datetime(2024, 3, 4, 11, 30)),
+			# starts before and ends after working hours
+			(datetime(2024, 3, 4, 7, 0), datetime(2024, 3, 4, 19, 0)),
+			# friday evening to monday morning
+			(datetime(2024, 3, 8, 16, 0, 0, 250000), datetime(2024, 3, 11, 10, 0, 0, 500000)),
+			# end before start
+			(datetime(2024, 3, 5, 12, 0), datetime(2024, 3, 5, 11, 0)),
+		]
+		for start, end in cases:
+			self.assertEqual(sla.calc_elapsed_time(start, end), calc_elapsed_time_per_second(sla, start, end))
+
+	def test_elapsed_time_cost_is_per_day(self):
+		sla = make_sla()
+		start = datetime(2024, 1, 1)
+		began = time.monotonic()
+		elapsed = sla.calc_elapsed_time(start, start + timedelta(days=366))
+		self.assertLess(time.monotonic() - began, 1)
+		# 2024 has 262 weekdays of 7.5 working hours each
+		self.assertEqual(elapsed, 262 * 7.5 * 3600)
+
+	def test_calc_time_is_inverse_of_elapsed_time(self):
+		sla = make_sla()
+		start = datetime(2024, 3, 8, 16, 0)
+		end = sla.calc_time(start, 2 * 3600)
+		self.assertEqual(end, datetime(2024, 3, 11, 10, 30))
+		self.assertEqual(sla.calc_elapsed_time(start, end), 2 * 3600)
+
+	def test_elapsed_time_skips_holidays(self):
+		sla = make_sla()
+		sla.get_holidays = lambda: HolidayIndex([date(2024, 3, 5)])
+		# monday noon to thursday noon with tuesday off
+		elapsed = sla.calc_elapsed_time(datetime(2024, 3, 4, 12, 0), datetime(2024, 3, 7, 12, 0))
+		self.assertEqual(elapsed, (5 + 7.5 + 2.5) * 3600)
+
+
+class IntegrationTestCRMSLARegistry(IntegrationTestCase):
+	def setUp(self):
+		frappe.db.delete("CRM Service Level Agreement")
+		if not frappe.db.exists("CRM Communication Status", "Open"):
+			frappe.get_doc({"doctype": "CRM Communication Status", "status": "Open"}).insert()
+		clear_sla_registry()
+
+	def make_sla(self, sla_name, condition=None, default=0):
+		sla = make_sla()
+		sla.update(
+			{
+				"sla_name": sla_name,
+				"condition": condition,
+				"default": default,
+				"enabled": 1,
+				"priorities": [{"priority": "Open", "default_priority": 1, "first_response_time": 3600}],
+			}
+		)
+		return sla.insert()
+
+	def make_lead(self, first_name):
+		lead = frappe.new_doc("CRM Lead")
+		lead.update({"first_name": first_name, "communication_status": "Open"})
+		return lead
+
+	def test_conditions_are_matched_from_cached_registry(self):
+		self.make_sla("Default SLA", default=1)
+		self.make_sla("VIP SLA", condition="doc.first_name == 'VIP'")
+		compile_condition.cache_clear()
+
+		self.assertEqual(get_sla(self.make_lead("VIP")).name, "VIP SLA")
+		self.assertEqual(get_sla(self.make_lead("Someone")).name, "Default SLA")
+
+		lead = self.make_lead("VIP")
+		with self.assertQueryCount(0):
+			get_sla(lead)
+		# the condition is compiled once and reused for every lead after
+		self.assertEqual(compile_condition.cache_info().misses, 1)
+		self.assertEqual(compile_condition.cache_info().hits, 2)
+
+	def test_registry_is_cleared_when_an_sla_is_saved(self):
+		sla = self.make_sla("VIP SLA", condition="doc.first_name == 'VIP'")
+		self.assertEqual([s.name for s in get_sla_registry("CRM Lead")], ["VIP SLA"])
+
+		sla.enabled = 0
+		sla.save()
+		self.assertEqual(get_sla_registry("CRM Lead"), [])
+		self.assertIsNone(get_sla(self.make_lead("VIP")))
+
+
+class IntegrationTestCRMSLASweep(IntegrationTestCase):
+	def make_lead(self, sla_status, response_by, first_responded_on=None, last_responded_on=None):
+		lead = frappe.get_doc({"doctype": "CRM Lead", "first_name": "SLA Sweep"}).insert()
+		frappe.db.set_value(
+			"CRM Lead",
+			lead.name,
+			{
+				"sla_status": sla_status,
+				"response_by": response_by,
+				"first_responded_on": first_responded_on,
+				"last_responded_on": last_responded_on,
+			},
+			update_modified=False,
+		)
+		return lead.name
+
+	def test_overdue_records_are_failed_in_batches(self):
+		past = datetime.now() - timedelta(hours=1)
+		future = datetime.now() + timedelta(hours=1)
+		expected = {
+			self.make_lead("First Response Due", past): "Failed",
+			self.make_lead("First Response Due", past - timedelta(days=1)): "Failed",
+			self.make_lead("Rolling Response Due", past): "Failed",
+			self.make_lead("First Response Due", future): "First Response Due",
+			self.make_lead("Rolling Response Due", future): "Rolling Response Due",
+			self.make_lead("Fulfilled", past, first_responded_on=past): "Fulfilled",
+		}
+
+		res = update_overdue_sla_status(batch_size=1)
+
+		for name, status in expected.items():
+			self.assertEqual(frappe.db.get_value("CRM Lead", name, "sla_status"), status)
+		self.assertGreaterEqual(res["CRM Lead"], 3)
+		self.assertEqual(update_overdue_sla_status()["CRM Lead"], 0)
+
+	def test_rolling_responses_are_failed_by_the_save_rule(self):
+		past = datetime.now() - timedelta(hours=1)
+		leads = [
+			self.make_lead("Rolling Response Due", past),
+			# responded after the deadline
+			self.make_lead("Rolling Response Due", past, past, past + timedelta(minutes=30)),
+			# responded in time, the next response is not due until saved again
+			self.make_lead("Rolling Response Due", past, past, past - timedelta(minutes=30)),
+		]
+
+		update_overdue_sla_status()
+
+		sla = frappe.new_doc("CRM Service Level Agreement")
+		for name, expected in zip(leads, ["Failed", "Failed", "Rolling Response Due"], strict=True):
+			lead = frappe.get_doc("CRM Lead", name)
+			self.assertEqual(lead.sla_status, expected)
+			self.assertEqual(sla.is_rolling_response_failed(lead), expected == "Failed")
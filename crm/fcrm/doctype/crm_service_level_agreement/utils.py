@@ -1,9 +1,25 @@
+import time
+import unicodedata
+from functools import lru_cache
+
 import frappe
 from frappe.model.document import Document
-from frappe.query_builder import JoinType
+from frappe.utils import get_datetime, now_datetime
 from frappe.utils.safe_exec import get_safe_globals
-from frappe.utils import now_datetime
-from pypika import Criterion
+
+try:
+	# private helpers of `frappe.safe_eval`, used to compile each condition once
+	from frappe.utils.safe_exec import (
+		WHITELISTED_SAFE_EVAL_GLOBALS,
+		FrappeTransformer,
+		_validate_safe_eval_syntax,
+	)
+	from RestrictedPython import compile_restricted
+except ImportError:
+	compile_restricted = None
+
+SLA_REGISTRY_CACHE_KEY = "crm_sla_registry"
+
 
 def get_sla(doc: Document) -> Document:
 	"""
@@ -12,40 +28,79 @@ def get_sla(doc: Document) -> Document:
 	:param doc: Lead/Deal to use
 	:return: Applicable SLA
 	"""
-	SLA = frappe.qb.DocType("CRM Service Level Agreement")
-	Priority = frappe.qb.DocType("CRM Service Level Priority")
 	now = now_datetime()
 	priority = doc.communication_status
-	q = (
-		frappe.qb.from_(SLA)
-		.select(SLA.name, SLA.condition)
-		.where(SLA.apply_on == doc.doctype)
-		.where(SLA.enabled == True)
-		.where(Criterion.any([SLA.start_date.isnull(), SLA.start_date <= now]))
-		.where(Criterion.any([SLA.end_date.isnull(), SLA.end_date >= now]))
+	context = None
+
+	for sla in get_sla_registry(doc.doctype):
+		if sla.start_date and get_datetime(sla.start_date) > now:
+			continue
+		if sla.end_date and get_datetime(sla.end_date) < now:
+			continue
+		if priority and priority not in sla.priorities:
+			continue
+		if not sla.condition:
+			return sla
+		if context is None:
+			context = get_context(doc)
+		if eval_condition(sla.condition, context):
+			return sla
+	return None
+
+
+def get_sla_registry(doctype: str) -> list[dict]:
+	"""
+	Get enabled SLAs that apply on `doctype`, with the default SLA last.
+	Cached per site until an SLA is saved or deleted.
+
+	:param doctype: Lead/Deal
+	:return: List of SLAs with their priorities
+	"""
+	return frappe.cache.hget(SLA_REGISTRY_CACHE_KEY, doctype, lambda: build_sla_registry(doctype))
+
+
+def build_sla_registry(doctype: str) -> list[dict]:
+	sla_list = frappe.get_all(
+		"CRM Service Level Agreement",
+		filters={"apply_on": doctype, "enabled": 1},
+		fields=["name", "condition", "default", "start_date", "end_date"],
+	)
+	priorities = frappe.get_all(
+		"CRM Service Level Priority",
+		filters={"parenttype": "CRM Service Level Agreement", "parent": ["in", [s.name for s in sla_list]]},
+		fields=["parent", "priority"],
 	)
-	if priority:
-		q = (
-			q.join(Priority, JoinType.inner)
-			.on(Priority.parent == SLA.name)
-			.where(Priority.priority == priority)
-		)
-	sla_list = q.run(as_dict=True)
-	res = None
+	for sla in sla_list:
+		sla.priorities = [p.priority for p in priorities if p.parent == sla.name]
 
 	# move default sla to the end of the list
-	for sla in sla_list:
-		if sla.get("default") == True:
-			sla_list.remove(sla)
-			sla_list.append(sla)
-			break
+	sla_list.sort(key=lambda sla: bool(sla.default))
+	return sla_list
+
+
+def clear_sla_registry():
+	frappe.cache.delete_value(SLA_REGISTRY_CACHE_KEY)
+
+
+def eval_condition(condition: str, context: dict):
+	"""
+	Evaluate an SLA `condition` the way `frappe.safe_eval` does, reusing the
+	compiled code for conditions seen before in this process. Falls back to
+	`frappe.safe_eval` if its helpers are not available in this Frappe version.
+	"""
+	if compile_restricted is None:
+		return frappe.safe_eval(condition, None, context)
+
+	eval_globals = {"__builtins__": {}, **WHITELISTED_SAFE_EVAL_GLOBALS}
+	return eval(compile_condition(condition), eval_globals, context)
+
+
+@lru_cache(maxsize=256)
+def compile_condition(condition: str):
+	condition = unicodedata.normalize("NFKC", condition)
+	_validate_safe_eval_syntax(condition)
+	return compile_restricted(condition, filename="<safe_eval>", policy=FrappeTransformer, mode="eval")
 
-	for sla in sla_list:
-		cond = sla.get("condition")
-		if not cond or frappe.safe_eval(cond, None, get_context(doc)):
-			res = sla
-			break
-	return res
 
 def get_context(d: Document) -> dict:
 	"""
@@ -54,8 +109,60 @@ def get_context(d: Document) -> dict:
 	:param doc: `Document` to add in context
 	:return: Context with `doc` and safe variables
 	"""
-	utils = get_safe_globals().get("frappe").get("utils")
+	if not getattr(frappe.local, "sla_safe_utils", None):
+		frappe.local.sla_safe_utils = get_safe_globals().get("frappe").get("utils")
 	return {
 		"doc": d.as_dict(),
-		"frappe": frappe._dict(utils=utils),
-	}
\ No newline at end of file
+		"frappe": frappe._dict(utils=frappe.local.sla_safe_utils),
+	}
+
+
+def update_overdue_sla_status(batch_size: int = 500) -> dict:
+	"""
+	Mark leads and deals whose first or rolling response is overdue as `Failed`,
+	by the same rules the SLA applies when the record is saved.
+
+	`sla_status` is otherwise only recomputed when the document is saved, so
+	this runs from the scheduler to keep list views and dashboards current.
+	Candidates are found through the `(sla_status, response_by)` index, so
+	only due records are scanned, and every batch is flipped with a single
+	UPDATE.
+
+	:param batch_size: Number of records to update per query
+	:return: Number of records updated per doctype
+	"""
+	res = {}
+	for doctype in ("CRM Lead", "CRM Deal"):
+		started_at = time.monotonic()
+		updated = 0
+		now = now_datetime()
+		table = frappe.qb.DocType(doctype)
+		# the rules `handle_sla_status` and `handle_rolling_sla_status` apply on save,
+		# so a record marked here stays Failed when it is saved again
+		for condition in (
+			(table.sla_status == "First Response Due") & table.first_responded_on.isnull(),
+			(table.sla_status == "Rolling Response Due")
+			& (table.last_responded_on.isnull() | (table.response_by < table.last_responded_on)),
+		):
+			while True:
+				names = (
+					frappe.qb.from_(table)
+					.select(table.name)
+					.where(condition & (table.response_by < now))
+					.orderby(table.response_by)
+					.limit(batch_size)
+					.run(pluck=True)
+				)
+				if not names:
+					break
+				frappe.qb.update(table).set(table.sla_status, "Failed").where(table.name.isin(names)).run()
+				if not frappe.flags.in_test:
+					frappe.db.commit()
+				updated += len(names)
+
+		res[doctype] = updated
+		if updated:
+			frappe.logger("crm").info(
+				f"SLA sweep: marked {updated} {doctype} records as Failed in {time.monotonic() - started_at:.2f}s"
+			)
+	return res
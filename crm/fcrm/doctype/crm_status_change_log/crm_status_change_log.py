@@ -12,6 +12,11 @@ class CRMStatusChangeLog(Document):
 	pass
 
 
+def on_doctype_update():
+	# `to` is a reserved word, so the index gets an explicit name
+	frappe.db.add_index("CRM Status Change Log", ["parent", "`to`"], "parent_to_index")
+
+
 def get_duration(from_date, to_date):
 	if not isinstance(from_date, datetime):
 		from_date = get_datetime(from_date)
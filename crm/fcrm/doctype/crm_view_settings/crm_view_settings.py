@@ -8,7 +8,15 @@ from frappe.utils import parse_json
 
 
 class CRMViewSettings(Document):
-	pass
+	def on_update(self):
+		from crm.api.doc import clear_view_meta_cache
+
+		clear_view_meta_cache(self.dt)
+
+	def on_trash(self):
+		from crm.api.doc import clear_view_meta_cache
+
+		clear_view_meta_cache(self.dt)
 
 
 @frappe.whitelist()
@@ -161,6 +169,10 @@ def set_as_default(name=None, type=None, doctype=None):
 		0,
 	)
 
+	from crm.api.doc import clear_view_meta_cache
+
+	clear_view_meta_cache(frappe.db.get_value("CRM View Settings", name, "dt"))
+
 
 @frappe.whitelist()
 def create_or_update_standard_view(view):
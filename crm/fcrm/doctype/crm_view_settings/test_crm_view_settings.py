@@ -1,9 +1,310 @@
 # Copyright (c) 2023, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
-# import frappe
-from frappe.tests import UnitTestCase
+import frappe
+from frappe.permissions import add_user_permission
+from frappe.tests import IntegrationTestCase, UnitTestCase
+
+from crm.api.doc import (
+	decode_cursor,
+	encode_cursor,
+	get_counts,
+	get_data,
+	get_group_by_values,
+	get_kanban_columns_data,
+	get_keyset_condition,
+	get_list_page,
+	get_total_count,
+	get_view_meta,
+)
+
+TEST_USER = "crm-view-test@example.com"
 
 
 class TestCRMViewSettings(UnitTestCase):
 	pass
+
+
+class TestListCursor(UnitTestCase):
+	def test_cursor_round_trip(self):
+		cursor = encode_cursor(["New", 3, None])
+		self.assertEqual(decode_cursor(cursor, 3), ["New", 3, None])
+		self.assertEqual(
+			decode_cursor(encode_cursor([frappe.utils.get_datetime("2024-01-01")]), 1),
+			["2024-01-01 00:00:00"],
+		)
+
+	def test_invalid_cursor_is_rejected(self):
+		for cursor in ["not a cursor", encode_cursor({"a": 1}), encode_cursor(["New"])]:
+			with self.assertRaises(frappe.ValidationError):
+				decode_cursor(cursor, 2)
+
+	def test_keyset_condition(self):
+		condition, values = get_keyset_condition([("status", "asc"), ("name", "desc")], ["New", "CRM-1"])
+		self.assertEqual(
+			condition,
+			"(`_list`.`status` > %(cursor_0)s or (`_list`.`status` = %(cursor_0)s and "
+			"(`_list`.`name` < %(cursor_1)s or `_list`.`name` is null)))",
+		)
+		self.assertEqual(values, {"cursor_0": "New", "cursor_1": "CRM-1"})
+
+	def test_keyset_condition_with_null_values(self):
+		# nulls come first in ascending order, so every non null value is after them
+		condition, _values = get_keyset_condition([("status", "asc"), ("name", "asc")], [None, "CRM-1"])
+		self.assertEqual(
+			condition,
+			"(`_list`.`status` is not null or (`_list`.`status` is null and `_list`.`name` > %(cursor_1)s))",
+		)
+		# and last in descending order, so nothing is after the last null
+		condition, _values = get_keyset_condition([("status", "desc")], [None])
+		self.assertEqual(condition, "1 = 0")
+
+
+def make_leads(count, status):
+	if not frappe.db.exists("CRM Lead Status", status):
+		frappe.get_doc({"doctype": "CRM Lead Status", "lead_status": status}).insert()
+	return [
+		frappe.get_doc({"doctype": "CRM Lead", "first_name": f"{status} {i}", "status": status}).insert().name
+		for i in range(count)
+	]
+
+
+def get_counts_per_record(d, doctype):
+	"""The per-record counting `get_counts` replaced, five queries for every record."""
+	d["_email_count"] = frappe.db.count(
+		"Communication",
+		filters={
+			"reference_doctype": doctype,
+			"reference_name": d.get("name"),
+			"communication_type": "Communication",
+		},
+	) + frappe.db.count(
+		"Communication",
+		filters={
+			"reference_doctype": doctype,
+			"reference_name": d.get("name"),
+			"communication_type": "Automated Message",
+		},
+	)
+	d["_comment_count"] = frappe.db.count(
+		"Comment",
+		filters={"reference_doctype": doctype, "reference_name": d.get("name"), "comment_type": "Comment"},
+	)
+	d["_task_count"] = frappe.db.count(
+		"CRM Task", filters={"reference_doctype": doctype, "reference_docname": d.get("name")}
+	)
+	d["_note_count"] = frappe.db.count(
+		"FCRM Note", filters={"reference_doctype": doctype, "reference_docname": d.get("name")}
+	)
+	return d
+
+
+def add_activities(lead, count):
+	for i in range(count):
+		for communication_type in ("Communication", "Automated Message", "Notification"):
+			frappe.get_doc(
+				{
+					"doctype": "Communication",
+					"communication_type": communication_type,
+					"communication_medium": "Email",
+					"subject": f"Activity {i}",
+					"reference_doctype": "CRM Lead",
+					"reference_name": lead,
+				}
+			).insert(ignore_permissions=True)
+		for comment_type in ("Comment", "Info"):
+			frappe.get_doc(
+				{
+					"doctype": "Comment",
+					"comment_type": comment_type,
+					"reference_doctype": "CRM Lead",
+					"reference_name": lead,
+					"content": f"Activity {i}",
+				}
+			).insert(ignore_permissions=True)
+		frappe.get_doc(
+			{
+				"doctype": "CRM Task",
+				"title": f"Activity {i}",
+				"reference_doctype": "CRM Lead",
+				"reference_docname": lead,
+			}
+		).insert(ignore_permissions=True)
+		frappe.get_doc(
+			{
+				"doctype": "FCRM Note",
+				"title": f"Activity {i}",
+				"reference_doctype": "CRM Lead",
+				"reference_docname": lead,
+			}
+		).insert(ignore_permissions=True)
+
+
+def make_test_user():
+	if not frappe.db.exists("User", TEST_USER):
+		user = frappe.get_doc({"doctype": "User", "email": TEST_USER, "first_name": "View Test"}).insert()
+		user.add_roles("Sales User")
+	return TEST_USER
+
+
+class IntegrationTestKanbanColumns(IntegrationTestCase):
+	def setUp(self):
+		frappe.db.delete("CRM Lead")
+		self.new = make_leads(5, "New")
+		self.contacted = make_leads(3, "Contacted")
+
+	def get_columns(self, page_lengths):
+		data = get_kanban_columns_data(
+			"CRM Lead", ["name", "first_name"], [], "creation desc", "status", page_lengths
+		)
+		return {column: [d.name for d in rows] for column, rows in data.items()}
+
+	def test_every_column_is_limited_to_its_page_length(self):
+		columns = self.get_columns({"New": 2, "Contacted": 10})
+		self.assertEqual(columns["New"], self.new[::-1][:2])
+		self.assertEqual(columns["Contacted"], self.contacted[::-1])
+
+	def test_load_more_extends_one_column(self):
+		first = self.get_columns({"New": 2, "Contacted": 1})
+		more = self.get_columns({"New": 4, "Contacted": 1})
+		self.assertEqual(more["New"][:2], first["New"])
+		self.assertEqual(more["New"], self.new[::-1][:4])
+		self.assertEqual(more["Contacted"], first["Contacted"])
+
+	def test_rows_are_filtered_by_permissions(self):
+		user = make_test_user()
+		visible = [self.new[0], self.new[3], self.contacted[1]]
+		for name in visible:
+			add_user_permission("CRM Lead", name, user)
+
+		frappe.set_user(user)
+		self.addCleanup(frappe.set_user, "Administrator")
+		columns = self.get_columns({"New": 10, "Contacted": 10})
+		self.assertEqual(sorted(columns["New"] + columns["Contacted"]), sorted(visible))
+
+
+class IntegrationTestListPages(IntegrationTestCase):
+	def setUp(self):
+		frappe.db.delete("CRM Lead")
+		make_leads(4, "Walk A")
+		make_leads(3, "Walk B")
+
+	def walk(self, order_by, page_length):
+		names, cursor, pages = [], "", 0
+		while True:
+			data, cursor = get_list_page("CRM Lead", ["name", "status"], {}, order_by, page_length, cursor)
+			names += [d.name for d in data]
+			pages += 1
+			if not cursor:
+				return names, pages
+
+	def test_pages_walk_all_records_once_with_ties_on_the_sort_field(self):
+		for direction in ("asc", "desc"):
+			expected = frappe.get_all(
+				"CRM Lead", order_by=f"status {direction}, name {direction}", pluck="name"
+			)
+			names, pages = self.walk(f"status {direction}", 2)
+			self.assertEqual(names, expected)
+			self.assertEqual(pages, 4)
+
+	def test_group_by_values_are_not_limited_to_a_page(self):
+		data, _cursor = get_list_page("CRM Lead", ["name", "status"], {}, "status asc", 2)
+		self.assertEqual({d.status for d in data}, {"Walk A"})
+		self.assertEqual(sorted(get_group_by_values("CRM Lead", {}, "status")), ["Walk A", "Walk B"])
+
+
+class IntegrationTestListCount(IntegrationTestCase):
+	def test_count_is_cached_until_a_record_is_added_or_deleted(self):
+		filters = {"first_name": ["like", "Count%"]}
+		lead = make_leads(2, "Count")[0]
+		self.assertEqual(get_total_count("CRM Lead", filters), (2, False))
+		with self.assertQueryCount(0):
+			self.assertEqual(get_total_count("CRM Lead", filters), (2, False))
+
+		# updates are only picked up once the cached count expires
+		frappe.db.set_value("CRM Lead", lead, "first_name", "Renamed")
+		self.assertEqual(get_total_count("CRM Lead", filters), (2, False))
+
+		new_lead = make_leads(1, "Count")[0]
+		self.assertEqual(get_total_count("CRM Lead", filters), (2, False))
+		frappe.delete_doc("CRM Lead", new_lead)
+		self.assertEqual(get_total_count("CRM Lead", filters), (1, False))
+
+	def test_other_doctypes_are_not_cached(self):
+		get_total_count("ToDo", {})
+		with self.assertQueryCount(1):
+			get_total_count("ToDo", {})
+
+
+class IntegrationTestViewMetaCache(IntegrationTestCase):
+	def test_view_meta_is_cleared_when_a_view_is_saved(self):
+		meta = get_view_meta("CRM Lead")
+		with self.assertQueryCount(0):
+			self.assertEqual(get_view_meta("CRM Lead")["version"], meta["version"])
+
+		view = frappe.get_doc(
+			{"doctype": "CRM View Settings", "label": "Cached View", "dt": "CRM Lead", "type": "list"}
+		).insert()
+		self.assertIn(view.name, [v.name for v in get_view_meta("CRM Lead")["views"]])
+
+	def test_view_meta_is_cleared_when_a_custom_field_is_saved(self):
+		get_view_meta("CRM Lead")
+		frappe.get_doc(
+			{
+				"doctype": "Custom Field",
+				"dt": "CRM Lead",
+				"fieldname": "cached_view_field",
+				"label": "Cached View Field",
+				"fieldtype": "Data",
+			}
+		).insert()
+		self.addCleanup(frappe.delete_doc, "Custom Field", "CRM Lead-cached_view_field")
+		self.assertIn("cached_view_field", [f["fieldname"] for f in get_view_meta("CRM Lead")["fields"]])
+
+
+class IntegrationTestActivityCounts(IntegrationTestCase):
+	def setUp(self):
+		frappe.db.delete("CRM Lead")
+		self.leads = make_leads(3, "Counted")
+		for i, lead in enumerate(self.leads):
+			add_activities(lead, i)
+
+	def test_counts_match_counting_each_record(self):
+		counts = get_counts("CRM Lead", self.leads)
+		for lead in self.leads:
+			expected = get_counts_per_record({"name": lead}, "CRM Lead")
+			del expected["name"]
+			self.assertEqual(counts[lead], expected)
+		# emails and automated messages are both counted
+		self.assertEqual(counts[self.leads[2]]["_email_count"], 4)
+
+	def test_count_queries_do_not_grow_with_records(self):
+		with self.assertQueryCount(4):
+			get_counts("CRM Lead", self.leads)
+		with self.assertQueryCount(1):
+			counts = get_counts("CRM Lead", self.leads, ["_note_count"])
+		self.assertEqual(counts[self.leads[2]], {"_note_count": 2})
+
+	def test_kanban_cards_only_count_their_fields(self):
+		def get_cards(kanban_fields):
+			data = get_data(
+				"CRM Lead",
+				{},
+				"creation desc",
+				column_field="status",
+				kanban_columns=[{"name": "Counted"}],
+				kanban_fields=kanban_fields,
+				view={"view_type": "kanban"},
+				skip_count=1,
+			)
+			return {d.name: d for d in data["data"][0]["data"]}
+
+		cards = get_cards(["first_name", "_email_count", "_task_count"])
+		self.assertEqual(cards[self.leads[2]]["_email_count"], 4)
+		self.assertEqual(cards[self.leads[2]]["_task_count"], 2)
+		self.assertNotIn("_note_count", cards[self.leads[2]])
+
+		cards = get_cards(["first_name"])
+		self.assertFalse(
+			set(cards[self.leads[2]]) & {"_email_count", "_comment_count", "_task_count", "_note_count"}
+		)
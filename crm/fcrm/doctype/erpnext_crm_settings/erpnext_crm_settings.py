@@ -2,13 +2,28 @@
 # For license information, please see license.txt
 
 import json
+import threading
+import time
 
 import frappe
+import requests
 from frappe import _
 from frappe.custom.doctype.property_setter.property_setter import make_property_setter
 from frappe.frappeclient import FrappeClient
 from frappe.model.document import Document
 from frappe.utils import get_url_to_form, get_url_to_list
+from requests.adapters import HTTPAdapter
+
+# (connect, read) timeout in seconds, overridden by `erpnext_site_timeout` in site config
+ERPNEXT_SITE_TIMEOUT = (5, 30)
+# consecutive failures after which requests to the site are refused for the cooldown, in seconds
+CIRCUIT_BREAKER_THRESHOLD = 5
+CIRCUIT_BREAKER_COOLDOWN = 60
+# responses that mean the site itself is down, errors of a single request don't count
+CIRCUIT_BREAKER_STATUS_CODES = {502, 503, 504}
+
+# a requests session is not safe to share between threads, so clients are kept per thread
+ERPNEXT_SITE_CLIENTS = threading.local()
 
 
 class ERPNextCRMSettings(Document):
@@ -74,8 +89,11 @@ class ERPNextCRMSettings(Document):
 	def reset_erpnext_form_script(self):
 		try:
 			if frappe.db.exists("CRM Form Script", "Create Quotation from CRM Deal"):
+				from crm.api.doc import clear_view_meta_cache
+
 				script = get_crm_form_script()
 				frappe.db.set_value("CRM Form Script", "Create Quotation from CRM Deal", "script", script)
+				clear_view_meta_cache("CRM Deal")
 				return True
 			return False
 		except Exception:
@@ -84,16 +102,74 @@ class ERPNextCRMSettings(Document):
 
 
 def get_erpnext_site_client(erpnext_crm_settings):
+	"""
+	Get the client of the remote ERPNext site. Clients are kept per thread and
+	reused for the same site and credentials, so their connections stay alive
+	between requests.
+	"""
 	site_url = erpnext_crm_settings.erpnext_site_url
 	api_key = erpnext_crm_settings.api_key
 	api_secret = erpnext_crm_settings.get_password("api_secret", raise_exception=False)
 
-	return FrappeClient(site_url, api_key=api_key, api_secret=api_secret)
+	clients = vars(ERPNEXT_SITE_CLIENTS)
+	key = (site_url, api_key, api_secret)
+	if key not in clients:
+		client = FrappeClient(site_url, api_key=api_key, api_secret=api_secret)
+		timeout = frappe.conf.get("erpnext_site_timeout") or ERPNEXT_SITE_TIMEOUT
+		adapter = ERPNextSiteAdapter(site_url, timeout)
+		client.session.mount("http://", adapter)
+		client.session.mount("https://", adapter)
+		clients[key] = client
+	return clients[key]
+
+
+class ERPNextSiteUnavailableError(frappe.ValidationError):
+	pass
+
+
+class ERPNextSiteAdapter(HTTPAdapter):
+	"""
+	Sends requests to the remote ERPNext site with a default timeout, and stops
+	sending them for a while once it keeps failing instead of letting every
+	request wait for it to time out.
+	"""
+
+	def __init__(self, site_url, timeout):
+		super().__init__()
+		self.site_url = site_url
+		self.timeout = tuple(timeout) if isinstance(timeout, list) else timeout
+		self.failures = 0
+		self.open_until = 0
+
+	def send(self, request, **kwargs):
+		if self.open_until > time.monotonic():
+			raise ERPNextSiteUnavailableError(
+				_("ERPNext site {0} is unavailable, try again in a minute").format(self.site_url)
+			)
+
+		if kwargs.get("timeout") is None:
+			kwargs["timeout"] = self.timeout
+		try:
+			response = super().send(request, **kwargs)
+		except (requests.ConnectionError, requests.Timeout):
+			self.record_failure()
+			raise
+
+		if response.status_code in CIRCUIT_BREAKER_STATUS_CODES:
+			self.record_failure()
+		else:
+			self.failures = 0
+		return response
+
+	def record_failure(self):
+		self.failures += 1
+		if self.failures >= CIRCUIT_BREAKER_THRESHOLD:
+			self.open_until = time.monotonic() + CIRCUIT_BREAKER_COOLDOWN
 
 
 @frappe.whitelist()
 def get_customer_link(crm_deal):
-	erpnext_crm_settings = frappe.get_single("ERPNext CRM Settings")
+	erpnext_crm_settings = frappe.get_cached_doc("ERPNext CRM Settings")
 	if not erpnext_crm_settings.enabled:
 		frappe.throw(_("ERPNext is not integrated with the CRM"))
 
@@ -119,7 +195,7 @@ def get_customer_link(crm_deal):
 
 @frappe.whitelist()
 def get_quotation_url(crm_deal, organization):
-	erpnext_crm_settings = frappe.get_single("ERPNext CRM Settings")
+	erpnext_crm_settings = frappe.get_cached_doc("ERPNext CRM Settings")
 	if not erpnext_crm_settings.enabled:
 		frappe.throw(_("ERPNext is not integrated with the CRM"))
 
@@ -238,7 +314,10 @@ def get_organization_address(organization):
 
 
 def create_customer_in_erpnext(doc, method):
-	erpnext_crm_settings = frappe.get_single("ERPNext CRM Settings")
+	if not doc.has_value_changed("status"):
+		return
+
+	erpnext_crm_settings = frappe.get_cached_doc("ERPNext CRM Settings")
 	if (
 		not erpnext_crm_settings.enabled
 		or not erpnext_crm_settings.create_customer_on_status_change
@@ -246,9 +325,35 @@ def create_customer_in_erpnext(doc, method):
 	):
 		return
 
+	from crm.fcrm.doctype.erpnext_customer_sync.erpnext_customer_sync import queue_customer_sync
+
+	queue_customer_sync(doc.name)
+
+
+def sync_customer_to_erpnext(crm_deal, erpnext_crm_settings):
+	"""
+	Create the customer of `crm_deal` in ERPNext unless it already exists there,
+	so that retrying a sync never creates a second customer.
+	"""
+	if not erpnext_crm_settings.is_erpnext_in_different_site:
+		if frappe.db.exists("Customer", {"crm_deal": crm_deal}):
+			return
+
+		from erpnext.crm.frappe_crm_api import create_customer
+
+		create_customer(get_customer(crm_deal))
+	else:
+		client = get_erpnext_site_client(erpnext_crm_settings)
+		if client.get_list("Customer", {"crm_deal": crm_deal}, limit_page_length=1):
+			return
+		client.post_api("erpnext.crm.frappe_crm_api.create_customer", get_customer(crm_deal))
+
+
+def get_customer(crm_deal):
+	doc = frappe.get_doc("CRM Deal", crm_deal)
 	contacts = get_contacts(doc)
 	address = get_organization_address(doc.organization)
-	customer = {
+	return {
 		"customer_name": doc.organization,
 		"customer_group": "All Customer Groups",
 		"customer_type": "Company",
@@ -260,23 +365,6 @@ def create_customer_in_erpnext(doc, method):
 		"contacts": json.dumps(contacts),
 		"address": json.dumps(address) if address else None,
 	}
-	if not erpnext_crm_settings.is_erpnext_in_different_site:
-		from erpnext.crm.frappe_crm_api import create_customer
-
-		create_customer(customer)
-	else:
-		create_customer_in_remote_site(customer, erpnext_crm_settings)
-
-	frappe.publish_realtime("crm_customer_created")
-
-
-def create_customer_in_remote_site(customer, erpnext_crm_settings):
-	client = get_erpnext_site_client(erpnext_crm_settings)
-	try:
-		client.post_api("erpnext.crm.frappe_crm_api.create_customer", customer)
-	except Exception:
-		frappe.log_error(frappe.get_traceback(), "Error while creating customer in remote site")
-		frappe.throw(_("Error while creating customer in ERPNext, check error log for more details"))
 
 
 @frappe.whitelist()
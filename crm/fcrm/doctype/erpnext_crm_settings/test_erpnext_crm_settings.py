@@ -1,9 +1,105 @@
 # Copyright (c) 2024, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
-# import frappe
-from frappe.tests import UnitTestCase
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import frappe
+from frappe.tests import IntegrationTestCase, UnitTestCase
+
+from crm.fcrm.doctype.erpnext_crm_settings.erpnext_crm_settings import (
+	CIRCUIT_BREAKER_THRESHOLD,
+	ERPNEXT_SITE_CLIENTS,
+	ERPNextSiteUnavailableError,
+	get_erpnext_site_client,
+)
 
 
 class TestERPNextCRMSettings(UnitTestCase):
 	pass
+
+
+class ERPNextSiteStandIn(BaseHTTPRequestHandler):
+	"""Answers like an ERPNext site, recording which connection each request came in on."""
+
+	protocol_version = "HTTP/1.1"
+
+	def do_GET(self):
+		self.respond({"data": [{"name": "CUST-0001"}]})
+
+	def do_POST(self):
+		self.rfile.read(int(self.headers.get("Content-Length", 0)))
+		self.respond({"message": "CUST-0001"})
+
+	def respond(self, body):
+		self.server.connections.append(self.client_address)
+		body = json.dumps(body).encode()
+		self.send_response(self.server.status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, *args):
+		pass
+
+
+class IntegrationTestERPNextSiteClient(IntegrationTestCase):
+	def setUp(self):
+		self.server = ThreadingHTTPServer(("127.0.0.1", 0), ERPNextSiteStandIn)
+		self.server.connections = []
+		self.server.status = 200
+		threading.Thread(target=self.server.serve_forever, daemon=True).start()
+		self.addCleanup(self.server.server_close)
+		self.addCleanup(self.server.shutdown)
+		self.addCleanup(vars(ERPNEXT_SITE_CLIENTS).clear)
+
+		self.settings = frappe.get_doc(
+			{
+				"doctype": "ERPNext CRM Settings",
+				"erpnext_site_url": f"http://127.0.0.1:{self.server.server_port}",
+				"api_key": "key",
+				"api_secret": "secret",
+			}
+		)
+
+	def test_client_is_reused_over_one_connection(self):
+		client = get_erpnext_site_client(self.settings)
+		self.assertIs(get_erpnext_site_client(self.settings), client)
+
+		for _ in range(3):
+			self.assertEqual(
+				get_erpnext_site_client(self.settings).get_list("Customer")[0]["name"], "CUST-0001"
+			)
+		self.assertEqual(len(set(self.server.connections)), 1)
+
+		self.settings.api_key = "other-key"
+		self.assertIsNot(get_erpnext_site_client(self.settings), client)
+
+	def test_clients_are_not_shared_between_threads(self):
+		get_erpnext_site_client(self.settings)
+		clients = []
+		thread = threading.Thread(target=lambda: clients.append(dict(vars(ERPNEXT_SITE_CLIENTS))))
+		thread.start()
+		thread.join()
+		self.assertEqual(len(vars(ERPNEXT_SITE_CLIENTS)), 1)
+		self.assertEqual(clients, [{}])
+
+	def test_failing_site_is_not_called_until_cooldown(self):
+		client = get_erpnext_site_client(self.settings)
+		self.server.status = 503
+		for _ in range(CIRCUIT_BREAKER_THRESHOLD):
+			client.post_api("erpnext.crm.frappe_crm_api.create_customer", {})
+
+		self.server.status = 200
+		with self.assertRaises(ERPNextSiteUnavailableError):
+			client.post_api("erpnext.crm.frappe_crm_api.create_customer", {})
+		self.assertEqual(len(self.server.connections), CIRCUIT_BREAKER_THRESHOLD)
+
+	def test_errors_of_a_single_request_do_not_open_the_breaker(self):
+		client = get_erpnext_site_client(self.settings)
+		self.server.status = 500
+		for _ in range(CIRCUIT_BREAKER_THRESHOLD + 1):
+			client.post_api("erpnext.crm.frappe_crm_api.create_customer", {})
+		self.assertEqual(len(self.server.connections), CIRCUIT_BREAKER_THRESHOLD + 1)
@@ -0,0 +1,91 @@
+# Copyright (c) 2026, Frappe and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_to_date, now_datetime
+
+from crm.fcrm.doctype.erpnext_crm_settings.erpnext_crm_settings import sync_customer_to_erpnext
+
+MAX_SYNC_ATTEMPTS = 5
+# a failed sync is retried after 2, 4, 8 and 16 minutes
+RETRY_BACKOFF_MINUTES = 2
+
+
+class ERPNextCustomerSync(Document):
+	pass
+
+
+def queue_customer_sync(crm_deal):
+	"""
+	Record that a customer has to be created in ERPNext for `crm_deal` and
+	queue the sync once the current transaction commits. A deal is only ever
+	synced once, however often it reaches the configured status.
+	"""
+	status = frappe.db.get_value("ERPNext Customer Sync", crm_deal, "status")
+	if status == "Synced":
+		return
+
+	if status is None:
+		frappe.get_doc(
+			{"doctype": "ERPNext Customer Sync", "crm_deal": crm_deal, "next_attempt_at": now_datetime()}
+		).insert(ignore_permissions=True)
+	elif status == "Failed":
+		frappe.db.set_value(
+			"ERPNext Customer Sync",
+			crm_deal,
+			{"status": "Pending", "attempts": 0, "next_attempt_at": now_datetime(), "error": None},
+		)
+
+	enqueue_customer_sync(crm_deal)
+
+
+def enqueue_customer_sync(crm_deal):
+	frappe.enqueue(
+		"crm.fcrm.doctype.erpnext_customer_sync.erpnext_customer_sync.sync_customer",
+		queue="long",
+		job_id=f"erpnext_customer_sync::{crm_deal}",
+		deduplicate=True,
+		enqueue_after_commit=True,
+		crm_deal=crm_deal,
+	)
+
+
+def sync_customer(crm_deal):
+	sync = frappe.db.get_value("ERPNext Customer Sync", crm_deal, ["status", "attempts"], as_dict=True)
+	if not sync or sync.status != "Pending":
+		return
+
+	if not frappe.db.exists("CRM Deal", crm_deal):
+		frappe.delete_doc("ERPNext Customer Sync", crm_deal, ignore_permissions=True)
+		return
+
+	try:
+		sync_customer_to_erpnext(crm_deal, frappe.get_cached_doc("ERPNext CRM Settings"))
+	except Exception:
+		frappe.db.rollback()
+		attempts = sync.attempts + 1
+		values = {"attempts": attempts, "error": frappe.get_traceback()}
+		if attempts >= MAX_SYNC_ATTEMPTS:
+			values["status"] = "Failed"
+			frappe.log_error(title=f"Error while creating customer in ERPNext for {crm_deal}")
+		else:
+			values["next_attempt_at"] = add_to_date(now_datetime(), minutes=RETRY_BACKOFF_MINUTES**attempts)
+		frappe.db.set_value("ERPNext Customer Sync", crm_deal, values)
+		return
+
+	frappe.db.set_value("ERPNext Customer Sync", crm_deal, {"status": "Synced", "error": None})
+	frappe.publish_realtime("crm_customer_created", after_commit=True)
+
+
+def retry_customer_syncs():
+	"""
+	Queue the pending syncs that are due, which also picks up any whose job
+	was lost before it ran.
+	"""
+	for crm_deal in frappe.get_all(
+		"ERPNext Customer Sync",
+		filters={"status": "Pending", "next_attempt_at": ["<=", now_datetime()]},
+		pluck="crm_deal",
+	):
+		enqueue_customer_sync(crm_deal)
@@ -0,0 +1,34 @@
+# Copyright (c) 2026, Frappe and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from crm.fcrm.doctype.erpnext_customer_sync.erpnext_customer_sync import (
+	queue_customer_sync,
+	sync_customer,
+)
+
+SYNC_MODULE = "crm.fcrm.doctype.erpnext_customer_sync.erpnext_customer_sync"
+
+
+class IntegrationTestERPNextCustomerSync(IntegrationTestCase):
+	def setUp(self):
+		self.deal = frappe.get_doc({"doctype": "CRM Deal", "lead_name": "Sync Test"}).insert(
+			ignore_mandatory=True
+		)
+
+	@patch(f"{SYNC_MODULE}.enqueue_customer_sync")
+	def test_deal_is_synced_once(self, enqueue):
+		with patch(f"{SYNC_MODULE}.sync_customer_to_erpnext") as sync_customer_to_erpnext:
+			queue_customer_sync(self.deal.name)
+			queue_customer_sync(self.deal.name)
+			sync_customer(self.deal.name)
+			sync_customer(self.deal.name)
+			queue_customer_sync(self.deal.name)
+
+		self.assertEqual(sync_customer_to_erpnext.call_count, 1)
+		self.assertEqual(enqueue.call_count, 2)
+		self.assertEqual(frappe.db.get_value("ERPNext Customer Sync", self.deal.name, "status"), "Synced")
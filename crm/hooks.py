@@ -141,8 +141,26 @@ override_doctype_class = {
 # Hook on document methods and events
 
 doc_events = {
+	"DocType": {
+		"on_update": ["crm.api.doc.on_doctype_meta_update"],
+		"on_trash": ["crm.api.doc.on_doctype_meta_update"],
+	},
+	"Custom Field": {
+		"on_update": ["crm.api.doc.on_doctype_meta_update"],
+		"on_trash": ["crm.api.doc.on_doctype_meta_update"],
+	},
+	"Property Setter": {
+		"on_update": ["crm.api.doc.on_doctype_meta_update"],
+		"on_trash": ["crm.api.doc.on_doctype_meta_update"],
+	},
 	"Contact": {
 		"validate": ["crm.api.contact.validate"],
+		"after_insert": ["crm.api.doc.clear_total_count_cache"],
+		"on_update": ["crm.fcrm.doctype.crm_phone_index.crm_phone_index.update_phone_index"],
+		"on_trash": [
+			"crm.fcrm.doctype.crm_phone_index.crm_phone_index.remove_from_phone_index",
+			"crm.api.doc.clear_total_count_cache",
+		],
 	},
 	"ToDo": {
 		"after_insert": ["crm.api.todo.after_insert"],
@@ -151,15 +169,58 @@ doc_events = {
 	"Comment": {
 		"on_update": ["crm.api.comment.on_update"],
 	},
+	"Version": {
+		"after_insert": ["crm.fcrm.doctype.crm_activity_log.crm_activity_log.add_version_to_activity_log"],
+	},
 	"WhatsApp Message": {
 		"validate": ["crm.api.whatsapp.validate"],
 		"on_update": ["crm.api.whatsapp.on_update"],
 	},
+	"CRM Lead": {
+		"after_insert": ["crm.api.doc.clear_total_count_cache"],
+		"on_update": [
+			"crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup.update_dashboard_rollup",
+			"crm.api.dashboard.clear_dashboard_cache",
+			"crm.fcrm.doctype.crm_phone_index.crm_phone_index.update_phone_index",
+		],
+		"on_trash": [
+			"crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup.remove_from_dashboard_rollup",
+			"crm.api.dashboard.clear_dashboard_cache",
+			"crm.fcrm.doctype.crm_phone_index.crm_phone_index.remove_from_phone_index",
+			"crm.api.doc.clear_total_count_cache",
+			"crm.fcrm.doctype.crm_activity_log.crm_activity_log.remove_from_activity_log",
+		],
+	},
 	"CRM Deal": {
+		"after_insert": ["crm.api.doc.clear_total_count_cache"],
 		"on_update": [
-			"crm.fcrm.doctype.erpnext_crm_settings.erpnext_crm_settings.create_customer_in_erpnext"
+			"crm.fcrm.doctype.erpnext_crm_settings.erpnext_crm_settings.create_customer_in_erpnext",
+			"crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup.update_dashboard_rollup",
+			"crm.api.dashboard.clear_dashboard_cache",
+		],
+		"on_trash": [
+			"crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup.remove_from_dashboard_rollup",
+			"crm.api.dashboard.clear_dashboard_cache",
+			"crm.api.doc.clear_total_count_cache",
+			"crm.fcrm.doctype.crm_activity_log.crm_activity_log.remove_from_activity_log",
 		],
 	},
+	"CRM Organization": {
+		"after_insert": ["crm.api.doc.clear_total_count_cache"],
+		"on_trash": ["crm.api.doc.clear_total_count_cache"],
+	},
+	"FCRM Note": {
+		"after_insert": ["crm.api.doc.clear_total_count_cache"],
+		"on_trash": ["crm.api.doc.clear_total_count_cache"],
+	},
+	"CRM Task": {
+		"after_insert": ["crm.api.doc.clear_total_count_cache"],
+		"on_trash": ["crm.api.doc.clear_total_count_cache"],
+	},
+	"CRM Call Log": {
+		"after_insert": ["crm.api.doc.clear_total_count_cache"],
+		"on_trash": ["crm.api.doc.clear_total_count_cache"],
+	},
 	"User": {
 		"before_validate": ["crm.api.demo.validate_user"],
 		"validate_reset_password": ["crm.api.demo.validate_reset_password"],
@@ -170,15 +231,24 @@ doc_events = {
 # ---------------
 
 scheduler_events = {
-	"all": ["crm.api.event.trigger_offset_event_notifications"],
+	"all": [
+		"crm.api.event.trigger_offset_event_notifications",
+		"crm.fcrm.doctype.crm_service_level_agreement.utils.update_overdue_sla_status",
+	],
 	"hourly": ["crm.api.event.trigger_hourly_event_notifications"],
 	"daily": ["crm.api.event.trigger_daily_event_notifications"],
 	"weekly": ["crm.api.event.trigger_weekly_event_notifications"],
-	"daily_long": ["crm.lead_syncing.background_sync.sync_leads_from_sources_daily"],
+	"daily_long": [
+		"crm.lead_syncing.background_sync.sync_leads_from_sources_daily",
+		"crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup.reconcile_dashboard_rollup",
+	],
 	"hourly_long": ["crm.lead_syncing.background_sync.sync_leads_from_sources_hourly"],
 	"monthly_long": ["crm.lead_syncing.background_sync.sync_leads_from_sources_monthly"],
 	"cron": {
-		"*/5 * * * *": ["crm.lead_syncing.background_sync.sync_leads_from_sources_5_minutes"],
+		"*/5 * * * *": [
+			"crm.lead_syncing.background_sync.sync_leads_from_sources_5_minutes",
+			"crm.fcrm.doctype.erpnext_customer_sync.erpnext_customer_sync.retry_customer_syncs",
+		],
 		"*/10 * * * *": ["crm.lead_syncing.background_sync.sync_leads_from_sources_10_minutes"],
 		"*/15 * * * *": ["crm.lead_syncing.background_sync.sync_leads_from_sources_15_minutes"],
 	},
@@ -210,7 +280,7 @@ scheduler_events = {
 # Ignore links to specified DocTypes when deleting documents
 # -----------------------------------------------------------
 
-ignore_links_on_delete = ["Failed Lead Sync Log"]
+ignore_links_on_delete = ["Failed Lead Sync Log", "ERPNext Customer Sync", "CRM Activity Log"]
 
 # Request Events
 # ----------------
@@ -1,8 +1,6 @@
 import frappe
-from frappe.query_builder import Order
-from pypika.functions import Replace
 
-from crm.utils import are_same_phone_number, parse_phone_number
+from crm.fcrm.doctype.crm_phone_index.crm_phone_index import get_phone_index_references_by_number
 
 
 @frappe.whitelist()
@@ -122,77 +120,74 @@ def get_contact_lead_or_deal_from_number(number):
 @frappe.whitelist()
 def get_contact_by_phone_number(phone_number):
 	"""Get contact by phone number."""
-	number = parse_phone_number(phone_number)
-
-	if number.get("is_valid"):
-		return get_contact(number.get("national_number"), number.get("country"))
-	else:
-		return get_contact(phone_number, number.get("country"), exact_match=True)
+	return get_contact(phone_number)
 
 
-def get_contact(phone_number, country="IN", exact_match=False):
+def get_contact(phone_number):
+	"""
+	Get the contact or unconverted lead with `phone_number`, through the phone index.
+	"""
 	if not phone_number:
 		return {"mobile_no": phone_number}
+	return get_contacts_by_phone_numbers([phone_number])[phone_number]
 
-	cleaned_number = (
-		phone_number.strip()
-		.replace(" ", "")
-		.replace("-", "")
-		.replace("(", "")
-		.replace(")", "")
-		.replace("+", "")
-	)
-
-	# Check if the number is associated with a contact
-	Contact = frappe.qb.DocType("Contact")
-	normalized_phone = Replace(
-		Replace(Replace(Replace(Replace(Contact.mobile_no, " ", ""), "-", ""), "(", ""), ")", ""), "+", ""
-	)
 
-	query = (
-		frappe.qb.from_(Contact)
-		.select(Contact.name, Contact.full_name, Contact.image, Contact.mobile_no)
-		.where(normalized_phone.like(f"%{cleaned_number}%"))
-		.orderby("modified", order=Order.desc)
-	)
-	contacts = query.run(as_dict=True)
+def get_contacts_by_phone_numbers(phone_numbers):
+	"""
+	Get the contact or unconverted lead of each of `phone_numbers`, through the phone index.
+	Contacts that are the primary contact of a deal come first, then leads,
+	then any other contact, most recently modified first.
 
-	if len(contacts):
-		# Check if the contact is associated with a deal
-		for contact in contacts:
-			if frappe.db.exists("CRM Contacts", {"contact": contact.name, "is_primary": 1}):
-				deal = frappe.db.get_value(
-					"CRM Contacts", {"contact": contact.name, "is_primary": 1}, "parent"
-				)
-				if are_same_phone_number(contact.mobile_no, phone_number, country, validate=not exact_match):
-					contact["deal"] = deal
-					return contact
-
-	# Else, Check if the number is associated with a lead
-	Lead = frappe.qb.DocType("CRM Lead")
-	normalized_phone = Replace(
-		Replace(Replace(Replace(Replace(Lead.mobile_no, " ", ""), "-", ""), "(", ""), ")", ""), "+", ""
+	All numbers are looked up together, so this takes the same few queries
+	however many numbers there are.
+	"""
+	references = get_phone_index_references_by_number(phone_numbers)
+	contact_names = list(
+		{name for refs in references.values() for doctype, name in refs if doctype == "Contact"}
 	)
-
-	query = (
-		frappe.qb.from_(Lead)
-		.select(Lead.name, Lead.lead_name, Lead.image, Lead.mobile_no)
-		.where(Lead.converted == 0)
-		.where(normalized_phone.like(f"%{cleaned_number}%"))
-		.orderby("modified", order=Order.desc)
+	lead_names = list(
+		{name for refs in references.values() for doctype, name in refs if doctype == "CRM Lead"}
 	)
-	leads = query.run(as_dict=True)
 
-	if len(leads):
-		for lead in leads:
-			if are_same_phone_number(lead.mobile_no, phone_number, country, validate=not exact_match):
-				lead["lead"] = lead.name
-				lead["full_name"] = lead.lead_name
-				return lead
+	contacts, deals, leads = [], {}, []
+	if contact_names:
+		contacts = frappe.get_all(
+			"Contact",
+			filters={"name": ["in", contact_names]},
+			fields=["name", "full_name", "image", "mobile_no"],
+			order_by="modified desc",
+		)
+		deals = dict(
+			frappe.get_all(
+				"CRM Contacts",
+				filters={"contact": ["in", contact_names], "is_primary": 1},
+				fields=["contact", "parent"],
+				as_list=True,
+			)
+		)
+	if lead_names:
+		leads = frappe.get_all(
+			"CRM Lead",
+			filters={"name": ["in", lead_names], "converted": 0},
+			fields=["name", "lead_name", "image", "mobile_no"],
+			order_by="modified desc",
+		)
 
-	if len(contacts) and are_same_phone_number(
-		contacts[0].mobile_no, phone_number, country, validate=not exact_match
-	):
-		return contacts[0]
+	res = {}
+	for number in phone_numbers:
+		refs = set(references[number])
+		number_contacts = [contact for contact in contacts if ("Contact", contact.name) in refs]
+		number_leads = [lead for lead in leads if ("CRM Lead", lead.name) in refs]
 
-	return {"mobile_no": phone_number}
+		# Check if the contact is associated with a deal
+		if contact := next((contact for contact in number_contacts if contact.name in deals), None):
+			res[number] = frappe._dict(contact, deal=deals[contact.name])
+		# Else, Check if the number is associated with a lead
+		elif number_leads:
+			lead = number_leads[0]
+			res[number] = frappe._dict(lead, lead=lead.name, full_name=lead.lead_name)
+		elif number_contacts:
+			res[number] = frappe._dict(number_contacts[0])
+		else:
+			res[number] = {"mobile_no": number}
+	return res
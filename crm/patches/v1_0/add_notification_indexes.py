@@ -0,0 +1,5 @@
+from crm.fcrm.doctype.crm_notification.crm_notification import on_doctype_update
+
+
+def execute():
+	on_doctype_update()
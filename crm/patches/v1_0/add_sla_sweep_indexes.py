@@ -0,0 +1,7 @@
+from crm.fcrm.doctype.crm_deal.crm_deal import on_doctype_update as add_deal_indexes
+from crm.fcrm.doctype.crm_lead.crm_lead import on_doctype_update as add_lead_indexes
+
+
+def execute():
+	add_lead_indexes()
+	add_deal_indexes()
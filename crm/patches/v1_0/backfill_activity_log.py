@@ -0,0 +1,5 @@
+from crm.fcrm.doctype.crm_activity_log.crm_activity_log import backfill_activity_log
+
+
+def execute():
+	backfill_activity_log()
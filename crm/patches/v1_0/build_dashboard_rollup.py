@@ -0,0 +1,5 @@
+from crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup import reconcile_dashboard_rollup
+
+
+def execute():
+	reconcile_dashboard_rollup()
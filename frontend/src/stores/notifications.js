@@ -4,15 +4,38 @@ import { computed, ref } from 'vue'
 
 export const visible = ref(false)
 
+export const nextCursor = ref(null)
+
 export const notifications = createResource({
   url: 'crm.api.notifications.get_notifications',
   initialData: [],
   auto: true,
+  transform: (data) => {
+    nextCursor.value = data.next_cursor
+    return data.notifications
+  },
+  onSuccess: () => unreadCount.reload(),
+})
+
+const moreNotifications = createResource({
+  url: 'crm.api.notifications.get_notifications',
+  onSuccess: (data) => {
+    nextCursor.value = data.next_cursor
+    notifications.data = [...notifications.data, ...data.notifications]
+  },
+})
+
+export function loadMoreNotifications() {
+  if (!nextCursor.value || moreNotifications.loading) return
+  moreNotifications.submit({ cursor: nextCursor.value })
+}
+
+const unreadCount = createResource({
+  url: 'crm.api.notifications.get_unread_notifications_count',
+  initialData: 0,
 })
 
-export const unreadNotificationsCount = computed(
-  () => notifications.data?.filter((n) => !n.read).length || 0,
-)
+export const unreadNotificationsCount = computed(() => unreadCount.data || 0)
 
 export const notificationsStore = defineStore('crm-notifications', () => {
   const mark_as_read = createResource({
@@ -37,6 +60,7 @@ export const notificationsStore = defineStore('crm-notifications', () => {
     unreadNotificationsCount,
     mark_as_read,
     mark_doc_as_read,
+    loadMoreNotifications,
     toggle,
   }
 })